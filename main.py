@@ -10,8 +10,9 @@ import sys
 import json
 import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 # Setup paths for Termux
@@ -32,6 +33,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# GGUF quantizations probed in order when no model path is configured.
+# Q4_0_8_8 suits ARM cores with i8mm (A710/A715/A78 and newer), Q4_K_M is
+# the best general-purpose 4-bit, Q4_0_4_4 targets older dotprod-only ARM.
+MODEL_CANDIDATES = [
+    "models/sarvam-1-2b-q4_0_8_8.gguf",
+    "models/sarvam-1-2b-q4_k_m.gguf",
+    "models/sarvam-1-2b-q4_0_4_4.gguf",
+    "models/sarvam-1-2b-q4.gguf",
+]
+
+# Sampling kwargs callers may override per generate() call
+GENERATE_KWARGS = frozenset(
+    {"max_tokens", "temperature", "top_p", "top_k", "repeat_penalty", "stop"}
+)
+
+
+def get_big_cores(count: int) -> List[int]:
+    """
+    Pick the `count` fastest CPUs by cpuinfo_max_freq.
+    Returns [] on symmetric SoCs or when sysfs is unavailable.
+    """
+    freqs = []
+    for path in Path("/sys/devices/system/cpu").glob("cpu[0-9]*/cpufreq/cpuinfo_max_freq"):
+        try:
+            freqs.append((int(path.read_text()), int(path.parent.parent.name[3:])))
+        except (OSError, ValueError):
+            continue
+
+    if len({freq for freq, _ in freqs}) < 2:
+        return []
+
+    freqs.sort(reverse=True)
+    return sorted(cpu for _, cpu in freqs[:count])
+
 
 class PersistentSarvamBrain:
     """
@@ -56,6 +91,29 @@ class PersistentSarvamBrain:
         self._loading = False
         self.config = self._load_config()
 
+        # llama.cpp in-process has a single context (one decode slot), so all
+        # completions queue on one inference thread instead of corrupting the
+        # KV cache. True continuous batching needs llama-server with --parallel.
+        # The thread is pinned to the big cores once the model loads.
+        self._inference_executor: Optional[ThreadPoolExecutor] = None
+
+        # Shared system prompt prefix and its saved KV state, prefilled once
+        # on the inference thread and restored when another prompt displaced it
+        self._prefix: Optional[str] = None
+        self._prefix_tokens: List[int] = []
+        self._prefix_state = None
+
+        # Precomputed sampling params - copied, not rebuilt, per request
+        sarvam = self.config.get("sarvam", {})
+        self._default_params = {
+            "max_tokens": sarvam.get("max_tokens", 512),
+            "temperature": sarvam.get("temperature", 0.7),
+            "stop": ["User:", "Human:"],
+        }
+        for key in ("top_p", "top_k", "repeat_penalty"):
+            if key in sarvam:
+                self._default_params[key] = sarvam[key]
+
     def _load_config(self) -> Dict:
         """Load config from file"""
         try:
@@ -70,7 +128,6 @@ class PersistentSarvamBrain:
         return {
             "assistant": {"name": "Closed Claw", "boss_name": "Boss"},
             "sarvam": {
-                "brain_model_path": "models/sarvam-1-2b-q4.gguf",
                 "context_length": 2048,
                 "max_tokens": 512,
             },
@@ -98,9 +155,7 @@ class PersistentSarvamBrain:
         try:
             from llama_cpp import Llama
 
-            model_path = BASE_DIR / self.config.get("sarvam", {}).get(
-                "brain_model_path", "models/sarvam-1-2b-q4.gguf"
-            )
+            model_path = self._resolve_model_path()
 
             if not model_path.exists():
                 logger.error(f"Model not found: {model_path}")
@@ -108,18 +163,36 @@ class PersistentSarvamBrain:
                 return False
 
             start_time = time.time()
+            n_threads, cores = self._plan_threads()
 
             # Load with mobile optimization
             self.model = Llama(
                 model_path=str(model_path),
                 n_ctx=self.config.get("sarvam", {}).get("context_length", 2048),
-                n_threads=4,  # Use 4 CPU cores
+                n_batch=self.config.get("sarvam", {}).get("n_batch", 512),  # Prompt tokens per eval
+                n_threads=n_threads,
                 n_gpu_layers=0,  # CPU only for mobile
                 use_mmap=True,  # Memory mapping
                 use_mlock=False,
+                flash_attn=self.config.get("sarvam", {}).get("flash_attn", True),
                 verbose=False,
             )
 
+            # Optional RAM prompt cache: keeps KV state for recent prompts so
+            # the stable system prefix is not re-prefilled after interleaving
+            cache_mb = self.config.get("sarvam", {}).get("prompt_cache_mb", 0)
+            if cache_mb:
+                from llama_cpp import LlamaRAMCache
+
+                self.model.set_cache(LlamaRAMCache(capacity_bytes=cache_mb << 20))
+
+            self._inference_executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="inference",
+                initializer=self._pin_inference_thread if cores else None,
+                initargs=(cores,) if cores else (),
+            )
+
             load_time = time.time() - start_time
             self._loaded = True
 
@@ -139,8 +212,56 @@ class PersistentSarvamBrain:
         finally:
             self._loading = False
 
+    def _resolve_model_path(self) -> Path:
+        """Configured model path, else the first quantization found on disk"""
+        configured = self.config.get("sarvam", {}).get("brain_model_path")
+        if configured:
+            return BASE_DIR / configured
+
+        for candidate in MODEL_CANDIDATES:
+            path = BASE_DIR / candidate
+            if path.exists():
+                return path
+        return BASE_DIR / MODEL_CANDIDATES[-1]
+
+    def _plan_threads(self) -> Tuple[int, List[int]]:
+        """
+        Choose the inference thread count and, on big.LITTLE SoCs, big cores.
+        int8 dot-product (dotprod/i8mm) kernels run ~3x slower on little cores,
+        so llama.cpp threads should never be scheduled there.
+        Returns (n_threads, cores); cores is [] when not pinning.
+        """
+        sarvam = self.config.get("sarvam", {})
+        n_threads = sarvam.get("threads", 4)
+        cores: List[int] = []
+
+        if sarvam.get("pin_big_cores", True) and hasattr(os, "sched_setaffinity"):
+            cores = get_big_cores(n_threads)
+            if cores:
+                n_threads = len(cores)
+
+        return n_threads, cores
+
+    @staticmethod
+    def _pin_inference_thread(cores: List[int]):
+        """
+        Executor initializer: pin the inference thread to the big cores.
+        sched_setaffinity(0) only affects the calling thread; llama.cpp spawns
+        its compute threads from this thread, so they inherit the mask while
+        the event loop thread stays unpinned.
+        """
+        try:
+            os.sched_setaffinity(0, cores)
+            logger.info(f"Pinned inference to big cores: {cores}")
+        except OSError as e:
+            logger.warning(f"Could not set CPU affinity: {e}")
+
     async def generate(
-        self, prompt: str, max_tokens: int = 512, temperature: float = 0.7
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        **kwargs,
     ) -> str:
         """Generate text - loads model if needed (first time only)"""
         # Load if not loaded
@@ -148,17 +269,19 @@ class PersistentSarvamBrain:
             if not self.load_model():
                 return "Error: Could not load AI model. Please check logs."
 
+        params = self._default_params.copy()
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        if temperature is not None:
+            params["temperature"] = temperature
+        if kwargs:
+            params.update({k: v for k, v in kwargs.items() if k in GENERATE_KWARGS})
+
         try:
             # Run in thread pool to not block
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
-                None,
-                lambda: self.model(
-                    prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    stop=["User:", "Human:"],
-                ),
+                self._inference_executor, self._complete, prompt, params
             )
 
             return result["choices"][0]["text"].strip()
@@ -166,6 +289,40 @@ class PersistentSarvamBrain:
             logger.error(f"Generation error: {e}")
             return f"Error: {e}"
 
+    def set_system_prefix(self, prefix: str):
+        """Register the prompt prefix shared by every request for KV reuse"""
+        if prefix != self._prefix:
+            self._prefix = prefix
+            self._prefix_tokens = []
+            self._prefix_state = None
+
+    def _complete(self, prompt: str, params: Dict[str, Any]) -> Dict:
+        """Run one completion on the shared context (inference thread)"""
+        if self._prefix and prompt.startswith(self._prefix):
+            self._restore_prefix()
+        return self.model(prompt, **params)
+
+    def _restore_prefix(self):
+        """
+        Make sure the context starts with the prefilled system prefix.
+        llama-cpp-python keeps the KV entries of the longest common token
+        prefix with the previous prompt, so only the user turn is prefilled.
+        """
+        if self._prefix_state is None:
+            # Tokenized the way create_completion tokenizes prompts; trailing
+            # whitespace merges with the next word, so it is left out
+            self._prefix_tokens = self.model.tokenize(
+                self._prefix.rstrip().encode("utf-8"), add_bos=True, special=True
+            )
+            self.model.reset()
+            self.model.eval(self._prefix_tokens)
+            self._prefix_state = self.model.save_state()
+            return
+
+        n = len(self._prefix_tokens)
+        if self.model.input_ids[:n].tolist() != self._prefix_tokens:
+            self.model.load_state(self._prefix_state)
+
     def is_loaded(self) -> bool:
         return self._loaded
 
@@ -178,6 +335,14 @@ class ClosedClawMobile:
         self.running = False
         self.config = self.brain.config
 
+        # Built once so every prompt shares an identical token prefix, which
+        # llama.cpp reuses from its KV cache instead of re-running prefill
+        self._system_prefix = (
+            f"You are Closed Claw, a helpful AI assistant for {self.get_boss_name()}. "
+            "Be concise and friendly.\n\nUser: "
+        )
+        self.brain.set_system_prefix(self._system_prefix)
+
     def get_boss_name(self) -> str:
         return self.config.get("assistant", {}).get("boss_name", "Boss")
 
@@ -198,8 +363,7 @@ class ClosedClawMobile:
             return self._get_help()
 
         # AI response for everything else
-        boss = self.get_boss_name()
-        prompt = f"You are Closed Claw, a helpful AI assistant for {boss}. Be concise and friendly.\n\nUser: {message}\n\nAssistant:"
+        prompt = f"{self._system_prefix}{message}\n\nAssistant:"
 
         return await self.brain.generate(prompt, max_tokens=256)
 
@@ -284,8 +448,17 @@ async def main():
 
 
 if __name__ == "__main__":
+    # libuv-backed event loop when available (faster socket/subprocess I/O)
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\nShutdown complete.")
         sys.exit(0)
\ No newline at end of file
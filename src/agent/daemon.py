@@ -419,4 +419,13 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # libuv-backed event loop when available (faster socket/subprocess I/O)
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
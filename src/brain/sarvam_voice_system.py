@@ -4,18 +4,57 @@ Sarvam Voice System - Authentic Indian Voices
 Uses Sarvam AI voice models exclusively for TTS
 """
 
+import os
+import itertools
 import logging
 import subprocess
 import asyncio
 import tempfile
-import requests
+import hashlib
+import wave
+import shutil
 import json
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
 
+# Fast non-cryptographic hashing for cache keys (optional)
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# C JSON codec for the voice cache index (optional)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Players that accept a WAV stream on stdin, in preference order
+STREAM_PLAYERS = [
+    ["play", "-q", "-t", "wav", "-"],
+    ["mpv", "--really-quiet", "--no-video", "-"],
+    ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-"],
+]
+
+# Bytes to buffer (WAV header + first PCM block) before starting playback
+STREAM_PREBUFFER_BYTES = 4096
+
+# Players for Piper's raw 16-bit mono PCM on stdin ({rate} = model sample rate)
+RAW_PCM_PLAYERS = [
+    ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1", "-r", "{rate}", "-"],
+    ["play", "-q", "-t", "raw", "-e", "signed-integer", "-b", "16", "-c", "1", "-r", "{rate}", "-"],
+    ["paplay", "--raw", "--format=s16le", "--channels=1", "--rate={rate}"],
+]
+
 
 @dataclass
 class VoiceConfig:
@@ -36,6 +75,7 @@ class VoiceConfig:
     # Response optimization
     enable_caching: bool = True
     cache_dir: str = "audio_cache"
+    ram_cache_mb: int = 32  # Hot WAVs kept in memory (stdin players only)
     
     # Performance
     max_concurrent_requests: int = 2
@@ -61,14 +101,38 @@ class SarvamVoiceSystem:
         self.cache_dir = Path(self.config.cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # Voice cache for instant responses
+        # Voice cache for instant responses (disk tier: key -> wav path)
         self.voice_cache: Dict[str, str] = {}
+        
+        # RAM tier: key -> wav bytes, LRU-evicted to stay under budget
+        self._ram_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._ram_bytes = 0
+        self._ram_budget = self.config.ram_cache_mb << 20
+        self._default_key_suffix = (
+            f":{self.config.default_language}:{self.config.default_speaker}".encode('utf-8')
+        )
         self._load_cache_index()
         
         # Track API usage for offline switching
         self.api_available = True
         self.offline_mode = False
         
+        # Recordings go to the temp dir (tmpfs on Termux) with unique names
+        self._rec_dir = Path(tempfile.gettempdir())
+        self._rec_seq = itertools.count()
+        
+        # Speech-to-text model, loaded on first listen() and kept resident
+        self._whisper = None
+        self._whisper_faster = False
+        
+        # Player that can start on a partial download (None = file playback)
+        self._stream_player = next(
+            (cmd for cmd in STREAM_PLAYERS if shutil.which(cmd[0])), None
+        )
+        
+        # Offline Piper pipeline (piper stdout -> raw PCM player stdin)
+        self._piper_cmd = self._resolve_piper()
+        
         logger.info("🎤 Sarvam Voice System initialized")
         logger.info(f"   Language: {self.config.default_language}")
         logger.info(f"   Speaker: {self.config.default_speaker}")
@@ -78,25 +142,38 @@ class SarvamVoiceSystem:
         cache_index = self.cache_dir / "cache_index.json"
         if cache_index.exists():
             try:
-                with open(cache_index, 'r') as f:
-                    self.voice_cache = json.load(f)
+                data = cache_index.read_bytes()
+                self.voice_cache = orjson.loads(data) if orjson else json.loads(data)
                 logger.info(f"📦 Loaded {len(self.voice_cache)} cached voice files")
-            except:
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Voice cache index corrupt: {e}")
                 self.voice_cache = {}
     
     def _save_cache_index(self):
         """Save voice cache index"""
         cache_index = self.cache_dir / "cache_index.json"
-        with open(cache_index, 'w') as f:
-            json.dump(self.voice_cache, f, indent=2)
+        if orjson:
+            cache_index.write_bytes(orjson.dumps(self.voice_cache, option=orjson.OPT_INDENT_2))
+        else:
+            with open(cache_index, 'w') as f:
+                json.dump(self.voice_cache, f, indent=2)
     
     def _get_cache_key(self, text: str, language: str = None, speaker: str = None) -> str:
         """Generate cache key for text"""
-        import hashlib
-        lang = language or self.config.default_language
-        spk = speaker or self.config.default_speaker
-        key = f"{text}:{lang}:{spk}"
-        return hashlib.md5(key.encode()).hexdigest()
+        if (language is None or language == self.config.default_language) and \
+                (speaker is None or speaker == self.config.default_speaker):
+            key = text.encode('utf-8') + self._default_key_suffix
+        else:
+            lang = language or self.config.default_language
+            spk = speaker or self.config.default_speaker
+            key = f"{text}:{lang}:{spk}".encode('utf-8')
+        
+        # BLAKE3 / xxh3 use SIMD (NEON on ARM); MD5 is the portable fallback
+        if blake3 is not None:
+            return blake3.blake3(key).hexdigest(16)
+        if xxhash is not None:
+            return xxhash.xxh3_128(key).hexdigest()
+        return hashlib.md5(key).hexdigest()
     
     async def speak(self, text: str, 
                    language: str = None,
@@ -113,15 +190,35 @@ class SarvamVoiceSystem:
         try:
             # Check cache first (instant response)
             cache_key = self._get_cache_key(text, language, speaker)
+            audio = self._ram_cache.get(cache_key)
+            if audio is not None:
+                self._ram_cache.move_to_end(cache_key)
+                logger.debug(f"🎯 RAM cache hit: {text[:30]}...")
+                return await self._play_bytes(audio)
+            
             if cache_key in self.voice_cache:
                 cached_file = self.voice_cache[cache_key]
                 if Path(cached_file).exists():
                     logger.debug(f"🎯 Cache hit: {text[:30]}...")
+                    if self._stream_player:
+                        audio = Path(cached_file).read_bytes()
+                        self._remember_audio(cache_key, audio)
+                        return await self._play_bytes(audio)
                     return await self._play_audio(cached_file)
             
             # Try Sarvam API for best quality
             if not self.offline_mode and self.api_available and self.config.sarvam_api_key:
                 try:
+                    if self._stream_player:
+                        # Playback starts while the tail is still downloading
+                        audio_file, audio, played = await asyncio.get_event_loop().run_in_executor(
+                            None, self._stream_sarvam_api, text, language, speaker, pace
+                        )
+                        self._remember_audio(cache_key, audio)
+                        self.voice_cache[cache_key] = str(audio_file)
+                        self._save_cache_index()
+                        return played
+                    
                     audio_file = await self._generate_sarvam_api(
                         text, language, speaker, pace
                     )
@@ -134,6 +231,10 @@ class SarvamVoiceSystem:
                     logger.warning(f"Sarvam API failed: {e}, using offline mode")
                     self.offline_mode = True
             
+            # Local Piper voice, streamed straight into the player
+            if self._piper_cmd and await self._speak_piper(text):
+                return True
+            
             # Fallback to Termux TTS (always works offline)
             return await self._speak_termux(text)
             
@@ -141,11 +242,11 @@ class SarvamVoiceSystem:
             logger.error(f"TTS error: {e}")
             return False
     
-    async def _generate_sarvam_api(self, text: str, 
-                                  language: str = None,
-                                  speaker: str = None,
-                                  pace: float = None) -> Optional[Path]:
-        """Generate speech using Sarvam AI TTS API"""
+    def _build_tts_request(self, text: str,
+                           language: str = None,
+                           speaker: str = None,
+                           pace: float = None) -> Tuple[str, Dict, Dict]:
+        """Build (url, headers, payload) for a Sarvam TTS request"""
         url = f"{self.config.sarvam_api_url}/text-to-speech"
         
         headers = {
@@ -159,6 +260,106 @@ class SarvamVoiceSystem:
             "speaker": speaker or self.config.default_speaker,
             "pace": pace or self.config.default_pace
         }
+        return url, headers, payload
+    
+    def _stream_sarvam_api(self, text: str,
+                           language: str = None,
+                           speaker: str = None,
+                           pace: float = None) -> Tuple[Path, bytes, bool]:
+        """
+        Stream Sarvam TTS audio to disk and to a stdin player at once
+        
+        Runs in an executor thread. Returns (audio_file, audio, played_ok).
+        """
+        import requests  # deferred: only the API path needs it
+        
+        url, headers, payload = self._build_tts_request(text, language, speaker, pace)
+        cache_key = self._get_cache_key(text, language, speaker)
+        audio_file = self.cache_dir / f"{cache_key}.wav"
+        
+        timeout = (self.config.timeout_seconds, self.config.timeout_seconds)
+        player = None
+        try:
+            with requests.post(url, json=payload, headers=headers,
+                               stream=True, timeout=timeout) as response:
+                if response.status_code != 200:
+                    raise Exception(f"API error: {response.status_code}")
+                
+                chunks = []
+                pending = []
+                pending_size = 0
+                
+                with open(audio_file, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=STREAM_PREBUFFER_BYTES):
+                        f.write(chunk)
+                        chunks.append(chunk)
+                        if player is None:
+                            pending.append(chunk)
+                            pending_size += len(chunk)
+                            if pending_size >= STREAM_PREBUFFER_BYTES:
+                                player = self._start_stream_player()
+                                self._feed_player(player, b"".join(pending))
+                                pending = None
+                        else:
+                            self._feed_player(player, chunk)
+                
+                # Utterance shorter than the prebuffer
+                if player is None:
+                    player = self._start_stream_player()
+                    self._feed_player(player, b"".join(pending))
+            
+            self._close_player_stdin(player)
+            try:
+                played = player.wait(timeout=self._playback_timeout(audio_file)) == 0
+            except subprocess.TimeoutExpired:
+                logger.warning("Streamed playback timed out")
+                played = False
+        finally:
+            # Download failed mid-stream or the player wedged: don't leave it behind
+            if player is not None:
+                if player.poll() is None:
+                    player.kill()
+                    player.wait()
+                self._close_player_stdin(player)
+        
+        logger.info(f"✅ Sarvam TTS (streamed): {text[:50]}...")
+        return audio_file, b"".join(chunks), played
+    
+    def _start_stream_player(self) -> subprocess.Popen:
+        """Spawn the stdin-fed audio player"""
+        return subprocess.Popen(
+            self._stream_player,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    
+    @staticmethod
+    def _close_player_stdin(player: subprocess.Popen):
+        """Signal end of audio to the player; it may already have exited"""
+        try:
+            player.stdin.close()
+        except BrokenPipeError:
+            pass
+    
+    @staticmethod
+    def _feed_player(player: subprocess.Popen, data: bytes):
+        """Write audio to the player; keep downloading if it exited early"""
+        if player.poll() is not None:
+            return
+        try:
+            player.stdin.write(data)
+        except BrokenPipeError:
+            pass
+    
+    async def _generate_sarvam_api(self, text: str, 
+                                  language: str = None,
+                                  speaker: str = None,
+                                  pace: float = None) -> Optional[Path]:
+        """Generate speech using Sarvam AI TTS API"""
+        import requests  # deferred: only the API path needs it
+        
+        url, headers, payload = self._build_tts_request(text, language, speaker, pace)
         
         try:
             response = await asyncio.wait_for(
@@ -184,23 +385,144 @@ class SarvamVoiceSystem:
         except asyncio.TimeoutError:
             raise Exception("Sarvam API timeout")
     
+    def _resolve_piper(self) -> Optional[Tuple[List[str], List[str]]]:
+        """Build (piper_cmd, player_cmd) if local Piper TTS is usable"""
+        model = self.config.piper_model_path
+        if not (self.config.local_tts_enabled and model and Path(model).exists()):
+            return None
+        if not shutil.which("piper"):
+            return None
+        
+        # Sample rate lives in the model's sidecar config
+        rate = 22050
+        try:
+            with open(f"{model}.json", 'r') as f:
+                rate = json.load(f).get("audio", {}).get("sample_rate", rate)
+        except (OSError, json.JSONDecodeError):
+            pass
+        
+        player = next((cmd for cmd in RAW_PCM_PLAYERS if shutil.which(cmd[0])), None)
+        if player is None:
+            return None
+        
+        piper = ["piper", "--model", model, "--output_raw"]
+        return piper, [arg.format(rate=rate) for arg in player]
+    
+    async def _speak_piper(self, text: str) -> bool:
+        """
+        Offline TTS with Piper, piping PCM into the player as it is produced
+        
+        No temp WAV: playback begins with the first synthesized frames.
+        """
+        piper_cmd, player_cmd = self._piper_cmd
+        player = piper = None
+        read_fd, write_fd = os.pipe()
+        try:
+            try:
+                player = await asyncio.create_subprocess_exec(
+                    *player_cmd,
+                    stdin=read_fd,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                piper = await asyncio.create_subprocess_exec(
+                    *piper_cmd,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=write_fd,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+            finally:
+                # Children hold their own copies of the pipe ends
+                os.close(read_fd)
+                os.close(write_fd)
+            
+            # Piper blocks on the pipe until played, so both track clip length
+            timeout = self._speech_timeout(text)
+            await asyncio.wait_for(piper.communicate(text.encode('utf-8')), timeout)
+            await asyncio.wait_for(player.wait(), timeout)
+            return piper.returncode == 0 and player.returncode == 0
+        except Exception as e:
+            logger.error(f"Piper TTS error: {e}")
+            return False
+        finally:
+            for proc in (piper, player):
+                if proc is not None and proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+    
+    def _speech_timeout(self, text: str) -> float:
+        """Generous bound on synthesizing and playing text (~10 chars/s + slack)"""
+        return len(text) / 10.0 + self.config.timeout_seconds
+    
     async def _speak_termux(self, text: str) -> bool:
         """Fallback to Termux TTS (works offline)"""
         try:
             cmd = ["termux-tts-speak", text]
-            process = await asyncio.create_subprocess_exec(*cmd)
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
             await process.wait()
             return process.returncode == 0
         except Exception as e:
             logger.error(f"Termux TTS error: {e}")
             return False
     
+    def _remember_audio(self, cache_key: str, audio: bytes):
+        """Put audio in the RAM tier, evicting least recently used entries"""
+        if len(audio) > self._ram_budget:
+            return
+        old = self._ram_cache.pop(cache_key, None)
+        if old is not None:
+            self._ram_bytes -= len(old)
+        self._ram_cache[cache_key] = audio
+        self._ram_bytes += len(audio)
+        while self._ram_bytes > self._ram_budget:
+            _, evicted = self._ram_cache.popitem(last=False)
+            self._ram_bytes -= len(evicted)
+    
+    async def _play_bytes(self, audio: bytes) -> bool:
+        """Play in-memory audio by piping it to the stdin player"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._stream_player,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            await asyncio.wait_for(process.communicate(audio), timeout=60.0)
+            return process.returncode == 0
+        except Exception as e:
+            logger.error(f"Audio playback error: {e}")
+            return False
+    
+    @staticmethod
+    def _playback_timeout(audio_file: str) -> float:
+        """Clip length from the WAV header plus slack, 60s if unreadable"""
+        try:
+            with wave.open(str(audio_file), "rb") as w:
+                return w.getnframes() / w.getframerate() + 2.0
+        except (OSError, EOFError, wave.Error, ZeroDivisionError):
+            return 60.0
+    
     async def _play_audio(self, audio_file: str) -> bool:
         """Play audio file"""
         try:
-            cmd = ["termux-media-player", "play", audio_file]
-            process = await asyncio.create_subprocess_exec(*cmd)
-            await asyncio.wait_for(process.wait(), timeout=60.0)
+            cmd = ["termux-media-player", "play", str(audio_file)]
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                await asyncio.wait_for(
+                    process.wait(), timeout=self._playback_timeout(audio_file)
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
             return process.returncode == 0
         except Exception as e:
             logger.error(f"Audio playback error: {e}")
@@ -209,22 +531,32 @@ class SarvamVoiceSystem:
     async def listen(self, duration: int = 5) -> Optional[str]:
         """Listen and convert speech to text using Whisper"""
         try:
-            audio_file = self.cache_dir / f"input_{asyncio.get_event_loop().time()}.wav"
+            audio_file = self._rec_dir / f"input_{os.getpid()}_{next(self._rec_seq)}.wav"
             
             # Record
             cmd = ["termux-microphone-record", "-f", str(audio_file), "-l", str(duration)]
-            process = await asyncio.create_subprocess_exec(*cmd)
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
             await process.wait()
             
             if not audio_file.exists():
                 return None
             
             # Transcribe with Whisper
-            import whisper
-            model = whisper.load_model("tiny", device="cpu")
-            result = model.transcribe(str(audio_file), language="hi", fp16=False)
+            if self._whisper is None:
+                self._load_whisper()
             
-            text = result.get("text", "").strip()
+            if self._whisper_faster:
+                segments, _ = self._whisper.transcribe(
+                    str(audio_file), language="hi", beam_size=1, vad_filter=True
+                )
+                text = "".join(s.text for s in segments).strip()
+            else:
+                result = self._whisper.transcribe(str(audio_file), language="hi", fp16=False)
+                text = result.get("text", "").strip()
             audio_file.unlink(missing_ok=True)
             
             return text
@@ -233,6 +565,19 @@ class SarvamVoiceSystem:
             logger.error(f"STT error: {e}")
             return None
     
+    def _load_whisper(self):
+        """Load Whisper tiny once (faster-whisper int8 preferred)"""
+        try:
+            from faster_whisper import WhisperModel
+            self._whisper = WhisperModel("tiny", device="cpu", compute_type="int8")
+            self._whisper_faster = True
+            logger.info("🎧 Loaded faster-whisper tiny (int8)")
+        except ImportError:
+            import whisper
+            self._whisper = whisper.load_model("tiny", device="cpu")
+            self._whisper_faster = False
+            logger.info("🎧 Loaded whisper tiny")
+    
     def get_available_voices(self) -> List[Dict]:
         """Get list of available Sarvam voices"""
         return [
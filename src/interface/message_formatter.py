@@ -7,7 +7,7 @@ Format messages for Telegram with support for various message types.
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 
 class FormatType(Enum):
@@ -59,9 +59,39 @@ class MessageFormatter:
     Supports multiple languages and formatting styles.
     """
     
+    # Status indicators, indexed by how many thresholds a value has crossed
+    _EMOJI = ("🟢", "🟡", "🔴")
+    
+    # PIN keypad layout, language independent
+    _AUTH_TEMPLATE = (
+        (("1️⃣", "auth:{}:1"), ("2️⃣", "auth:{}:2"), ("3️⃣", "auth:{}:3")),
+        (("4️⃣", "auth:{}:4"), ("5️⃣", "auth:{}:5"), ("6️⃣", "auth:{}:6")),
+        (("7️⃣", "auth:{}:7"), ("8️⃣", "auth:{}:8"), ("9️⃣", "auth:{}:9")),
+        (("❌", "auth:{}:cancel"), ("0️⃣", "auth:{}:0"), ("✓", "auth:{}:submit")),
+    )
+    
     def __init__(self, language: str = "en"):
         self.language = language
         self._translations = self._load_translations()
+        # Resolve the language once so _t() is a single dict lookup
+        self._t_table = self._translations.get(language, self._translations["en"])
+        self._status_template = (
+            f"⚙️ *{self._t('system_status')}*\n\n"
+            f"{{cpu_emoji}} *{self._t('cpu')}:* {{cpu:.1f}}%\n"
+            f"{{mem_emoji}} *{self._t('memory')}:* {{memory:.1f}}%\n"
+            f"{{disk_emoji}} *{self._t('disk')}:* {{disk:.1f}}%\n"
+            f"⏱ *{self._t('uptime')}:* {{uptime:.1f}}h\n"
+            f"📋 *{self._t('tasks')}:* {{tasks}}\n"
+            f"🔔 *{self._t('pending')}:* {{pending}}"
+        )
+        # Button layouts as (text, callback_data template) rows; only the
+        # callback id changes between calls
+        self._confirm_labels = (f"✓ {self._t('confirm')}", f"✗ {self._t('cancel')}")
+        self._call_template = (
+            ((f"✓ {self._t('accept')}", "call_accept:{}"),
+             (f"✗ {self._t('reject')}", "call_reject:{}")),
+            ((f"⏰ {self._t('snooze')}", "call_snooze:{}"),),
+        )
     
     def _load_translations(self) -> Dict[str, Dict[str, str]]:
         """Load translations for supported languages."""
@@ -126,7 +156,7 @@ class MessageFormatter:
     
     def _t(self, key: str) -> str:
         """Get translation for key."""
-        return self._translations.get(self.language, {}).get(key, key)
+        return self._t_table.get(key, key)
     
     def format_call_notification(self, call: CallInfo) -> str:
         """
@@ -167,20 +197,15 @@ class MessageFormatter:
         """
         lines = [
             f"💬 *{self._t('whatsapp_summary')}*",
-            f"_{total_unread} {self._t('unread')}_\n"
+            f"_{total_unread} {self._t('unread')}_\n",
+            *(
+                f"• *{msg.group_name} • {msg.sender}*: {self._preview(msg.message_preview)}"
+                if msg.is_group and msg.group_name else
+                f"• *{msg.sender}*: {self._preview(msg.message_preview)}"
+                for msg in messages[:5]  # Show max 5
+            )
         ]
         
-        for msg in messages[:5]:  # Show max 5
-            sender = msg.sender
-            if msg.is_group and msg.group_name:
-                sender = f"{msg.group_name} • {sender}"
-            
-            preview = msg.message_preview[:50]
-            if len(msg.message_preview) > 50:
-                preview += "..."
-            
-            lines.append(f"• *{sender}*: {preview}")
-        
         if len(messages) > 5:
             lines.append(f"\n_...and {len(messages) - 5} more_")
         
@@ -201,20 +226,19 @@ class MessageFormatter:
         Returns:
             Formatted message string
         """
-        lines = [
+        return "\n".join([
             f"📱 *{self._t('sms_summary')}*",
-            f"_{total_unread} {self._t('unread')}_\n"
-        ]
-        
-        for msg in messages[:5]:
-            sender = msg.get("sender", "Unknown")
-            preview = msg.get("body", "")[:50]
-            if len(msg.get("body", "")) > 50:
-                preview += "..."
-            
-            lines.append(f"• *{sender}*: {preview}")
-        
-        return "\n".join(lines)
+            f"_{total_unread} {self._t('unread')}_\n",
+            *(
+                f"• *{msg.get('sender', 'Unknown')}*: {self._preview(msg.get('body', ''))}"
+                for msg in messages[:5]
+            )
+        ])
+    
+    @staticmethod
+    def _preview(text: str, limit: int = 50) -> str:
+        """Truncate a message body for a summary line."""
+        return text if len(text) <= limit else f"{text[:limit]}..."
     
     def format_system_status(self, status: SystemStatus) -> str:
         """
@@ -226,19 +250,18 @@ class MessageFormatter:
         Returns:
             Formatted message string
         """
-        # Add emojis based on status
-        cpu_emoji = "🟢" if status.cpu_percent < 50 else "🟡" if status.cpu_percent < 80 else "🔴"
-        mem_emoji = "🟢" if status.memory_percent < 50 else "🟡" if status.memory_percent < 80 else "🔴"
-        disk_emoji = "🟢" if status.disk_percent < 80 else "🟡" if status.disk_percent < 90 else "🔴"
-        
-        return (
-            f"⚙️ *{self._t('system_status')}*\n\n"
-            f"{cpu_emoji} *{self._t('cpu')}:* {status.cpu_percent:.1f}%\n"
-            f"{mem_emoji} *{self._t('memory')}:* {status.memory_percent:.1f}%\n"
-            f"{disk_emoji} *{self._t('disk')}:* {status.disk_percent:.1f}%\n"
-            f"⏱ *{self._t('uptime')}:* {status.uptime_hours:.1f}h\n"
-            f"📋 *{self._t('tasks')}:* {status.active_tasks}\n"
-            f"🔔 *{self._t('pending')}:* {status.pending_notifications}"
+        # Add emojis based on status: each threshold crossed bumps the index
+        cpu, mem, disk = status.cpu_percent, status.memory_percent, status.disk_percent
+        return self._status_template.format(
+            cpu_emoji=self._EMOJI[(cpu >= 50) + (cpu >= 80)],
+            mem_emoji=self._EMOJI[(mem >= 50) + (mem >= 80)],
+            disk_emoji=self._EMOJI[(disk >= 80) + (disk >= 90)],
+            cpu=cpu,
+            memory=mem,
+            disk=disk,
+            uptime=status.uptime_hours,
+            tasks=status.active_tasks,
+            pending=status.pending_notifications,
         )
     
     def format_auth_request(self, action: str, level: int) -> str:
@@ -302,10 +325,11 @@ class MessageFormatter:
         Returns:
             Button layout definition
         """
+        confirm, cancel = self._confirm_labels
         return [
             [
-                {"text": f"✓ {self._t('confirm')}", "callback_data": confirm_callback},
-                {"text": f"✗ {self._t('cancel')}", "callback_data": cancel_callback}
+                {"text": confirm, "callback_data": confirm_callback},
+                {"text": cancel, "callback_data": cancel_callback}
             ]
         ]
     
@@ -319,15 +343,7 @@ class MessageFormatter:
         Returns:
             Button layout definition
         """
-        return [
-            [
-                {"text": f"✓ {self._t('accept')}", "callback_data": f"call_accept:{call_id}"},
-                {"text": f"✗ {self._t('reject')}", "callback_data": f"call_reject:{call_id}"}
-            ],
-            [
-                {"text": f"⏰ {self._t('snooze')}", "callback_data": f"call_snooze:{call_id}"}
-            ]
-        ]
+        return self._render_buttons(self._call_template, call_id)
     
     def create_auth_buttons(self, request_id: str) -> List[List[Dict[str, str]]]:
         """
@@ -339,25 +355,15 @@ class MessageFormatter:
         Returns:
             Button layout definition
         """
+        return self._render_buttons(self._AUTH_TEMPLATE, request_id)
+    
+    @staticmethod
+    def _render_buttons(
+        template: Tuple[Tuple[Tuple[str, str], ...], ...],
+        callback_id: str
+    ) -> List[List[Dict[str, str]]]:
+        """Fill a button template; fresh dicts since callers may mutate them."""
         return [
-            [
-                {"text": "1️⃣", "callback_data": f"auth:{request_id}:1"},
-                {"text": "2️⃣", "callback_data": f"auth:{request_id}:2"},
-                {"text": "3️⃣", "callback_data": f"auth:{request_id}:3"}
-            ],
-            [
-                {"text": "4️⃣", "callback_data": f"auth:{request_id}:4"},
-                {"text": "5️⃣", "callback_data": f"auth:{request_id}:5"},
-                {"text": "6️⃣", "callback_data": f"auth:{request_id}:6"}
-            ],
-            [
-                {"text": "7️⃣", "callback_data": f"auth:{request_id}:7"},
-                {"text": "8️⃣", "callback_data": f"auth:{request_id}:8"},
-                {"text": "9️⃣", "callback_data": f"auth:{request_id}:9"}
-            ],
-            [
-                {"text": "❌", "callback_data": f"auth:{request_id}:cancel"},
-                {"text": "0️⃣", "callback_data": f"auth:{request_id}:0"},
-                {"text": "✓", "callback_data": f"auth:{request_id}:submit"}
-            ]
+            [{"text": text, "callback_data": data.format(callback_id)} for text, data in row]
+            for row in template
         ]
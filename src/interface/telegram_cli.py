@@ -9,17 +9,49 @@ import asyncio
 import json
 import logging
 import re
+import shutil
 import subprocess
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
 from datetime import datetime
 
 
 logger = logging.getLogger(__name__)
 
+# Most queued sends written to the daemon in a single socket write
+SEND_BATCH_SIZE = 64
 
-@dataclass
+# Most message/button handler tasks allowed in flight at once
+MAX_HANDLER_TASKS = 32
+
+# Longest wait for the daemon to answer a command before the connection is
+# treated as stalled, so a lost reply cannot hold the command lock forever
+COMMAND_TIMEOUT_S = 10.0
+
+# Escapes for text inside a quoted telegram-cli argument; an unescaped
+# newline would end the command and start another on the socket
+_QUOTE_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def _escape(text: str) -> str:
+    """Escape text for use inside a quoted command argument."""
+    return text.translate(_QUOTE_ESCAPES)
+
+
+def _quote(text: str) -> str:
+    """Quote text as a single telegram-cli argument."""
+    return f'"{_escape(text)}"'
+
+
+# Peer types whose id is the chat a message belongs to
+_GROUP_PEER_TYPES = frozenset({"chat", "channel"})
+
+# dialog_list line: [chat_id] [user_id] [username] [timestamp] [message]
+_MSG_RE = re.compile(r'\[(\d+)\]\s*\[(\d+)\]\s*@?(\w*)\s*\[(\d{2}:\d{2})\]\s*(.+)')
+
+
+@dataclass(slots=True)
 class TelegramButton:
     """Inline keyboard button."""
     text: str
@@ -27,7 +59,7 @@ class TelegramButton:
     url: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TelegramMessage:
     """Telegram message structure."""
     message_id: int
@@ -63,9 +95,25 @@ class TelegramCLI:
         self._button_handlers: Dict[str, Callable[[str, int], None]] = {}
         self._read_task: Optional[asyncio.Task] = None
         self._message_queue: asyncio.Queue = asyncio.Queue()
+        self._next_msg_id = 0
+        
+        # Bounded handler fan-out; the read loop waits for a free slot
+        self._handler_slots = asyncio.Semaphore(MAX_HANDLER_TASKS)
+        self._handler_tasks: Set[asyncio.Task] = set()
+        
+        # Persistent connection to the daemon's command socket
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._cmd_lock = asyncio.Lock()
+        
+        # Outgoing sends, drained in batches by _send_loop
+        self._send_queue: asyncio.Queue = asyncio.Queue()
+        self._send_task: Optional[asyncio.Task] = None
         
         # User state tracking
         self._authorized_users: Set[int] = set()
+        # Immutable snapshot for lock-free reads from any thread
+        self._authorized_frozen: FrozenSet[int] = frozenset()
         self._user_sessions: Dict[int, dict] = {}
     
     async def connect(self) -> bool:
@@ -77,13 +125,7 @@ class TelegramCLI:
         """
         try:
             # Check if telegram-cli is available
-            result = subprocess.run(
-                ["which", "telegram-cli"],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
+            if shutil.which("telegram-cli") is None:
                 logger.error("telegram-cli not found. Please install it first.")
                 return False
             
@@ -94,15 +136,16 @@ class TelegramCLI:
                 "-S", str(self.socket_path),
                 "-d",
                 "-W",  # Wait for network
-                "-C"   # No color
+                "-C",  # No color
+                "--json"  # Pushed updates carry sender ids as JSON events
             ]
             
+            # Output is never read; pipes would fill and stall the daemon
             self._cli_process = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                text=True
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
             )
             
             # Wait for socket to be created
@@ -112,8 +155,11 @@ class TelegramCLI:
                 logger.error("telegram-cli socket not created")
                 return False
             
+            await self._open_socket()
+            
             self._connected = True
             self._read_task = asyncio.create_task(self._read_loop())
+            self._send_task = asyncio.create_task(self._send_loop())
             
             logger.info("Connected to telegram-cli")
             return True
@@ -126,12 +172,21 @@ class TelegramCLI:
         """Disconnect from telegram-cli."""
         self._connected = False
         
-        if self._read_task:
-            self._read_task.cancel()
-            try:
-                await self._read_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._read_task, self._send_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        
+        # Fail sends that never reached the daemon
+        while not self._send_queue.empty():
+            _, future = self._send_queue.get_nowait()
+            if not future.done():
+                future.set_exception(ConnectionError("Disconnected from telegram-cli"))
+        
+        await self._close_socket()
         
         if self._cli_process:
             self._cli_process.terminate()
@@ -146,26 +201,119 @@ class TelegramCLI:
         """Check if connected to telegram-cli."""
         return self._connected and self._cli_process is not None
     
+    async def _open_socket(self):
+        """Open the persistent command connection to the daemon."""
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            path=str(self.socket_path)
+        )
+    
+    async def _close_socket(self):
+        """Close the command connection if open."""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+    
+    async def _read_answer(self) -> str:
+        """Read one 'ANSWER <len>' framed reply."""
+        header = await self._reader.readuntil(b"\n")
+        if not header.startswith(b"ANSWER "):
+            raise RuntimeError(f"Unexpected reply: {header.decode(errors='replace').strip()}")
+        
+        # Payload is followed by a single newline terminator
+        payload = await self._reader.readexactly(int(header[7:]) + 1)
+        return payload[:-1].decode("utf-8", errors="replace")
+    
+    async def _bounded(self, awaitable):
+        """Await a socket exchange, treating a stalled daemon as a dropped connection."""
+        try:
+            return await asyncio.wait_for(awaitable, COMMAND_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise ConnectionError(
+                f"No reply from telegram-cli within {COMMAND_TIMEOUT_S:g}s"
+            ) from None
+    
+    def _drop_socket(self):
+        """Discard the command connection without waiting for it to close."""
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+    
+    async def _roundtrip(self, command: str) -> str:
+        """Send one command and read its reply."""
+        self._writer.write(command.encode("utf-8") + b"\n")
+        await self._writer.drain()
+        return await self._read_answer()
+    
     async def _execute(self, command: str) -> str:
         """Execute a telegram-cli command."""
         if not self.is_connected():
             raise ConnectionError("Not connected to telegram-cli")
         
-        # Use socat to communicate with daemon
-        cmd = f'echo "{command}" | socat - UNIX-CONNECT:{self.socket_path}'
-        
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await proc.communicate()
-        
-        if proc.returncode != 0:
-            raise RuntimeError(f"Command failed: {stderr.decode()}")
+        async with self._cmd_lock:
+            try:
+                if self._writer is None:
+                    await self._open_socket()
+                try:
+                    return await self._bounded(self._roundtrip(command))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # Daemon dropped or stalled the connection; reconnect once and retry
+                    self._drop_socket()
+                    await self._open_socket()
+                    return await self._bounded(self._roundtrip(command))
+            except BaseException:
+                # A half-read reply would desync the stream; start fresh next time
+                self._drop_socket()
+                raise
+    
+    async def _send_loop(self):
+        """Drain queued sends, pipelining each batch in one socket write."""
+        while self._connected:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._send_queue.get()]
+            while len(batch) < SEND_BATCH_SIZE and not self._send_queue.empty():
+                batch.append(self._send_queue.get_nowait())
+            
+            try:
+                async with self._cmd_lock:
+                    if self._writer is None:
+                        await self._open_socket()
+                    try:
+                        self._writer.write(
+                            b"".join(cmd.encode("utf-8") + b"\n" for cmd, _ in batch)
+                        )
+                        await self._bounded(self._writer.drain())
+                        # Replies come back in command order; a missing one
+                        # would shift every later reply onto the wrong send
+                        for _, future in batch:
+                            result = await self._bounded(self._read_answer())
+                            if not future.done():
+                                future.set_result(result)
+                    except BaseException:
+                        # Rest of the batch is unanswered; drop the stream and
+                        # fail those sends below
+                        self._drop_socket()
+                        raise
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Error sending batch: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    async def _queue_send(self, command: str) -> str:
+        """Queue a send command for the batch writer and await its reply."""
+        if not self.is_connected():
+            raise ConnectionError("Not connected to telegram-cli")
         
-        return stdout.decode()
+        future = asyncio.get_running_loop().create_future()
+        await self._send_queue.put((command, future))
+        return await future
     
     async def send_message(
         self,
@@ -187,17 +335,12 @@ class TelegramCLI:
             True if sent successfully
         """
         try:
-            # Escape quotes in text
-            safe_text = text.replace('"', '\\"')
-            
+            command = f'msg user#{int(user_id)} {_quote(text)}'
             if buttons:
                 # Create inline keyboard markup
-                keyboard = self._format_inline_keyboard(buttons)
-                command = f'msg user#{user_id} "{safe_text}" {keyboard}'
-            else:
-                command = f'msg user#{user_id} "{safe_text}"'
+                command += f' {self._format_inline_keyboard(buttons)}'
             
-            result = await self._execute(command)
+            result = await self._queue_send(command)
             
             if "SUCCESS" in result or len(result.strip()) > 0:
                 logger.debug(f"Message sent to user {user_id}")
@@ -215,33 +358,42 @@ class TelegramCLI:
         buttons: List[List[TelegramButton]]
     ) -> str:
         """Format inline keyboard for telegram-cli."""
-        rows = []
-        for row in buttons:
-            row_buttons = []
-            for btn in row:
-                if btn.url:
-                    row_buttons.append(f"[\\\"{btn.text}\\\"](\\\"{btn.url}\\\")")
-                else:
-                    row_buttons.append(f"[\\\"{btn.text}\\\"](\\\"{btn.callback_data}\\\")")
-            rows.append("[" + ",".join(row_buttons) + "]")
-        
-        return "[" + ",".join(rows) + "]"
+        return "[" + ",".join(
+            "[" + ",".join(
+                f'[\\"{_escape(btn.text)}\\"](\\"{_escape(btn.url or btn.callback_data)}\\")'
+                for btn in row
+            ) + "]"
+            for row in buttons
+        ) + "]"
     
     async def _read_loop(self):
-        """Background loop to read incoming messages."""
+        """Background loop that receives pushed updates from the daemon."""
         while self._connected:
             try:
-                # Use dialog_list to poll for updates
-                result = await self._execute("dialog_list 10")
-                
-                # Parse messages
-                messages = self._parse_messages(result)
-                
-                for msg in messages:
-                    await self._message_queue.put(msg)
-                    await self._process_message(msg)
-                
-                await asyncio.sleep(1)
+                # A dedicated connection registered with main_session gets
+                # every update pushed to it, so nothing needs polling
+                reader, writer = await asyncio.open_unix_connection(
+                    path=str(self.socket_path)
+                )
+                try:
+                    writer.write(b"main_session\n")
+                    await writer.drain()
+                    
+                    while self._connected:
+                        chunk = await reader.readline()
+                        if not chunk:
+                            raise ConnectionError("Update stream closed")
+                        if chunk.startswith(b"ANSWER "):
+                            chunk = (await reader.readexactly(int(chunk[7:]) + 1))[:-1]
+                        
+                        # Parse messages
+                        messages = self._parse_messages(chunk.decode("utf-8", errors="replace"))
+                        
+                        for msg in messages:
+                            await self._message_queue.put(msg)
+                            await self._process_message(msg)
+                finally:
+                    writer.close()
                 
             except asyncio.CancelledError:
                 break
@@ -252,26 +404,36 @@ class TelegramCLI:
     def _parse_messages(self, raw_output: str) -> List[TelegramMessage]:
         """Parse telegram-cli output into messages."""
         messages = []
+        match_line = _MSG_RE.match
+        # Lines only carry HH:MM; date them today, resolved once per batch
+        today = datetime.now()
+        year, month, day = today.year, today.month, today.day
         
         # Simple parsing - telegram-cli format varies
-        lines = raw_output.strip().split('\n')
-        
-        for line in lines:
-            # Match pattern: [chat_id] [user_id] [username] [timestamp] [message]
-            match = re.match(
-                r'\[(\d+)\]\s*\[(\d+)\]\s*@?(\w*)\s*\[(\d{2}:\d{2})\]\s*(.+)',
-                line
-            )
+        for line in raw_output.strip().splitlines():
+            if line.startswith("{"):
+                msg = self._parse_json_update(line)
+                if msg is not None:
+                    messages.append(msg)
+                continue
+            
+            match = match_line(line)
             
             if match:
                 chat_id = int(match.group(1))
                 user_id = int(match.group(2))
                 username = match.group(3) or None
-                timestamp = datetime.strptime(match.group(4), "%H:%M")
+                clock = match.group(4)
+                try:
+                    timestamp = datetime(year, month, day, int(clock[:2]), int(clock[3:]))
+                except ValueError:
+                    continue
                 text = match.group(5)
                 
+                # Local sequence number; output lines carry no message id
+                self._next_msg_id += 1
                 msg = TelegramMessage(
-                    message_id=hash(line),  # Approximate
+                    message_id=self._next_msg_id,
                     chat_id=chat_id,
                     user_id=user_id,
                     username=username,
@@ -282,6 +444,40 @@ class TelegramCLI:
         
         return messages
     
+    def _parse_json_update(self, line: str) -> Optional[TelegramMessage]:
+        """Parse one --json main_session event; None for anything but an incoming text message."""
+        try:
+            event = json.loads(line)
+            if event.get("event") != "message" or event.get("out") or "text" not in event:
+                return None
+            
+            sender = event["from"]
+            user_id = int(sender["peer_id"])
+            to = event.get("to") or {}
+            if to.get("peer_type") in _GROUP_PEER_TYPES:
+                chat_id = int(to["peer_id"])
+            else:
+                # Private message: the conversation is with the sender
+                chat_id = user_id
+            timestamp = datetime.fromtimestamp(event["date"])
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError, OSError):
+            return None
+        
+        # Newer builds send string ids; fall back to the local sequence
+        message_id = event.get("id")
+        if not isinstance(message_id, int):
+            self._next_msg_id += 1
+            message_id = self._next_msg_id
+        
+        return TelegramMessage(
+            message_id=message_id,
+            chat_id=chat_id,
+            user_id=user_id,
+            username=sender.get("username") or None,
+            text=event["text"],
+            timestamp=timestamp
+        )
+    
     async def _process_message(self, message: TelegramMessage):
         """Process incoming message."""
         # Check for button callbacks
@@ -289,15 +485,31 @@ class TelegramCLI:
             callback_data = message.text[1:]
             if callback_data in self._button_handlers:
                 handler = self._button_handlers[callback_data]
-                asyncio.create_task(handler(callback_data, message.user_id))
+                await self._dispatch(handler, callback_data, message.user_id)
                 return
         
         # Call registered handlers
         for handler in self._message_handlers:
-            try:
-                asyncio.create_task(handler(message))
-            except Exception as e:
-                logger.error(f"Error in message handler: {e}")
+            await self._dispatch(handler, message)
+    
+    async def _dispatch(self, handler: Callable, *args):
+        """Run a handler as a task once one of the bounded slots is free."""
+        await self._handler_slots.acquire()
+        task = asyncio.create_task(self._run_handler(handler, *args))
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_done)
+    
+    def _handler_done(self, task: asyncio.Task):
+        """Release a finished handler's slot."""
+        self._handler_tasks.discard(task)
+        self._handler_slots.release()
+    
+    async def _run_handler(self, handler: Callable, *args):
+        """Await a handler, logging instead of leaking its errors."""
+        try:
+            await handler(*args)
+        except Exception as e:
+            logger.error(f"Error in message handler: {e}")
     
     def on_message(self, handler: Callable[[TelegramMessage], None]):
         """Register message handler."""
@@ -320,9 +532,11 @@ class TelegramCLI:
     ) -> bool:
         """Answer callback query (acknowledge button press)."""
         try:
+            if not query_id or any(c.isspace() for c in query_id):
+                raise ValueError(f"Invalid query id: {query_id!r}")
             command = f'answer_inline_query {query_id}'
             if text:
-                command += f' "{text}"'
+                command += f' {_quote(text)}'
             
             await self._execute(command)
             return True
@@ -333,7 +547,7 @@ class TelegramCLI:
     async def delete_message(self, user_id: int, message_id: int) -> bool:
         """Delete a sent message."""
         try:
-            command = f'delete_msg user#{user_id} {message_id}'
+            command = f'delete_msg user#{int(user_id)} {int(message_id)}'
             await self._execute(command)
             return True
         except Exception as e:
@@ -343,7 +557,7 @@ class TelegramCLI:
     async def get_user_info(self, user_id: int) -> Optional[dict]:
         """Get user information."""
         try:
-            result = await self._execute(f'user_info user#{user_id}')
+            result = await self._execute(f'user_info user#{int(user_id)}')
             # Parse user info from output
             return {"user_id": user_id, "raw": result}
         except Exception as e:
@@ -353,14 +567,16 @@ class TelegramCLI:
     def register_user(self, user_id: int):
         """Register authorized user."""
         self._authorized_users.add(user_id)
+        self._authorized_frozen = frozenset(self._authorized_users)
         logger.info(f"User {user_id} registered")
     
     def unregister_user(self, user_id: int):
         """Unregister user."""
         self._authorized_users.discard(user_id)
+        self._authorized_frozen = frozenset(self._authorized_users)
         self._user_sessions.pop(user_id, None)
         logger.info(f"User {user_id} unregistered")
     
     def is_user_authorized(self, user_id: int) -> bool:
         """Check if user is authorized."""
-        return user_id in self._authorized_users
+        return user_id in self._authorized_frozen
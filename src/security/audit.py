@@ -4,7 +4,11 @@ Logs all actions with timestamps for security monitoring
 """
 
 import os
+import time
 import json
+import queue
+import atexit
+import reprlib
 import hashlib
 import logging
 from datetime import datetime, timedelta
@@ -13,6 +17,51 @@ from typing import Any, Dict, Optional
 from functools import wraps
 import threading
 
+# C JSON codec for audit entries (optional)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bounded repr for decorator-captured arguments
+_arg_repr = reprlib.Repr()
+_arg_repr.maxstring = 120
+_arg_repr.maxother = 120
+_arg_repr.maxlist = _arg_repr.maxtuple = _arg_repr.maxdict = 5
+
+# Repeats of the same routine event inside this window are folded into
+# one summary entry, capped at COALESCE_MAX repeats per summary
+COALESCE_WINDOW_S = 10.0
+COALESCE_MAX = 100
+
+# Most open coalescing windows; past this the oldest is summarised early
+COALESCE_MAX_KEYS = 1024
+
+# ISO timestamp cache: entries within this many seconds share one string
+_TS_RESOLUTION_S = 0.01
+_cached_ts = (float("-inf"), "")
+
+
+def _now_iso() -> str:
+    """Current local time as ISO-8601, reformatted at most every 10ms"""
+    global _cached_ts
+    t = time.monotonic()
+    if t - _cached_ts[0] >= _TS_RESOLUTION_S:
+        _cached_ts = (t, datetime.now().isoformat())
+    return _cached_ts[1]
+
+
+def _dumps(entry: Dict[str, Any]) -> bytes:
+    """Serialize an audit entry to a JSON line"""
+    if orjson:
+        return orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(entry) + '\n').encode('utf-8')
+
+
+def _loads(line: bytes) -> Any:
+    """Parse one JSON line"""
+    return orjson.loads(line) if orjson else json.loads(line)
+
 
 class AuditLogger:
     """
@@ -39,8 +88,28 @@ class AuditLogger:
         # Thread-safe logging
         self._lock = threading.Lock()
         
-        # Setup rotation
+        # O_APPEND descriptor for the current log, opened on first write
+        self._fd: Optional[int] = None
+        
+        # Running SHA-256 of the current log, fed as entries are written
+        self._hasher = None
+        
+        # Setup rotation; later checks wait until the next local midnight
+        self._rotate_at = 0.0
         self._setup_rotation()
+        self._hasher = self._file_hasher(self.current_log)
+        
+        # Coalescing buckets: key -> [window start, repeats, last event args]
+        self._buckets: Dict[tuple, list] = {}
+        self._bucket_lock = threading.Lock()
+        
+        # Callers only enqueue serialized entries; one thread does the I/O
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._drain, name="audit-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
         
     def _setup_rotation(self):
         """Setup daily log rotation (keep 30 days)"""
@@ -52,6 +121,9 @@ class AuditLogger:
         
         # Clean old logs
         self._clean_old_logs()
+        
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        self._rotate_at = datetime.combine(tomorrow, datetime.min.time()).timestamp()
     
     def _rotate_log(self):
         """Rotate current log to archive"""
@@ -63,12 +135,103 @@ class AuditLogger:
         ).strftime("%Y%m%d")
         archive_path = self.archive_dir / f"audit_{timestamp}.log"
         
+        # Flush and release the handle before hashing and moving the file
+        self._close_handle()
+        
         # Add integrity hash before archiving
-        self._add_integrity_hash(self.current_log)
+        hash_value = self._hasher.hexdigest() if self._hasher is not None else None
+        self._add_integrity_hash(self.current_log, hash_value)
         
         # Move to archive
         self.current_log.rename(archive_path)
+        if self._hasher is not None:
+            self._hasher = hashlib.sha256()
         
+    def _close_handle(self):
+        """Close the current log descriptor if open"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _append(self, data: bytes):
+        """Append raw bytes to the current log, feeding the running hash"""
+        if self._fd is None:
+            self._fd = os.open(
+                self.current_log,
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC,
+                0o600
+            )
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            self._hasher.update(view[:written])
+            view = view[written:]
+    
+    def _drain(self):
+        """Writer thread: append queued entries in batches"""
+        next_sweep = time.monotonic() + COALESCE_WINDOW_S
+        while True:
+            try:
+                batch = [self._queue.get(timeout=COALESCE_WINDOW_S)]
+            except queue.Empty:
+                batch = []
+            
+            # Summarise closed windows at most once per window, busy or idle,
+            # so a steady stream of other entries cannot hold them back
+            now = time.monotonic()
+            if now >= next_sweep:
+                self._flush_buckets()
+                next_sweep = now + COALESCE_WINDOW_S
+            
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if not batch:
+                continue
+            
+            blobs = [item for item in batch if isinstance(item, bytes)]
+            if blobs:
+                with self._lock:
+                    try:
+                        if time.time() >= self._rotate_at:
+                            self._setup_rotation()
+                        # One write(2) per batch, no Python-level buffering
+                        self._append(b"".join(blobs))
+                    except Exception as e:
+                        # Fallback to stderr if file logging fails
+                        print(f"AUDIT LOG ERROR: {e}", flush=True)
+            
+            # Wake flush() callers only after everything before them is written
+            stop = False
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    stop = True
+            if stop:
+                return
+    
+    def flush(self, timeout: float = 5.0):
+        """Block until entries logged so far are written"""
+        self._flush_buckets(force=True)
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+    
+    def close(self):
+        """Flush and close the audit log"""
+        self._flush_buckets(force=True)
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+        with self._lock:
+            self._close_handle()
+    
     def _clean_old_logs(self):
         """Remove logs older than 30 days"""
         cutoff = datetime.now() - timedelta(days=30)
@@ -81,15 +244,23 @@ class AuditLogger:
             except OSError:
                 pass
     
-    def _add_integrity_hash(self, log_file: Path):
+    @staticmethod
+    def _file_hasher(log_file: Path):
+        """SHA-256 object fed with the file's contents, read in 1MB chunks"""
+        hasher = hashlib.sha256()
+        if log_file.exists():
+            with open(log_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    hasher.update(chunk)
+        return hasher
+    
+    def _add_integrity_hash(self, log_file: Path, hash_value: Optional[str] = None):
         """Add SHA-256 hash for tamper detection"""
         if not log_file.exists():
             return
-            
-        with open(log_file, 'rb') as f:
-            content = f.read()
         
-        hash_value = hashlib.sha256(content).hexdigest()
+        if hash_value is None:
+            hash_value = self._file_hasher(log_file).hexdigest()
         timestamp = datetime.now().isoformat()
         
         integrity_entry = {
@@ -106,8 +277,7 @@ class AuditLogger:
         if not log_file.exists() or not self.integrity_file.exists():
             return True
             
-        with open(log_file, 'rb') as f:
-            current_hash = hashlib.sha256(f.read()).hexdigest()
+        current_hash = self._file_hasher(log_file).hexdigest()
         
         with open(self.integrity_file, 'r') as f:
             for line in f:
@@ -129,48 +299,92 @@ class AuditLogger:
             user: User/system performing action
             success: Whether action succeeded
         """
-        with self._lock:
-            self._setup_rotation()
-            
-            entry = {
-                "timestamp": datetime.now().isoformat(),
-                "action": action,
-                "category": category,
-                "user": user,
-                "success": success,
-                "details": details
-            }
-            
-            try:
-                with open(self.current_log, 'a') as f:
-                    f.write(json.dumps(entry) + '\n')
-            except Exception as e:
-                # Fallback to stderr if file logging fails
-                print(f"AUDIT LOG ERROR: {e}", flush=True)
+        entry = {
+            "timestamp": _now_iso(),
+            "action": action,
+            "category": category,
+            "user": user,
+            "success": success,
+            "details": details
+        }
+        
+        try:
+            self._queue.put(_dumps(entry))
+        except Exception as e:
+            # Fallback to stderr if the entry cannot be serialized
+            print(f"AUDIT LOG ERROR: {e}", flush=True)
+    
+    def _log_coalesced(self, key: tuple, action: str, category: str,
+                       details: Dict[str, Any], user: str, success: bool):
+        """Log the first of a run of identical events, count the repeats"""
+        now = time.monotonic()
+        evicted = None
+        with self._bucket_lock:
+            bucket = self._buckets.get(key)
+            if (bucket is not None and now - bucket[0] < COALESCE_WINDOW_S
+                    and bucket[1] < COALESCE_MAX):
+                bucket[1] += 1
+                return
+            if bucket is not None:
+                # Re-inserted below, keeping the dict ordered by window start
+                del self._buckets[key]
+            elif len(self._buckets) >= COALESCE_MAX_KEYS:
+                evicted = self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = [now, 0, (action, category, details, user, success)]
+        
+        if evicted is not None:
+            self._emit_summary(evicted, now)
+        if bucket is not None:
+            self._emit_summary(bucket, now)
+        self.log(action, category, details, user, success)
+    
+    def _emit_summary(self, bucket: list, now: float):
+        """Write one entry standing for a bucket's suppressed repeats"""
+        start, repeats, (action, category, details, user, success) = bucket
+        if repeats:
+            self.log(
+                action=action,
+                category=category,
+                details={**details, "repeats": repeats, "span_s": round(now - start, 3)},
+                user=user,
+                success=success
+            )
+    
+    def _flush_buckets(self, force: bool = False):
+        """Emit summaries for closed (or, when forced, all) windows"""
+        now = time.monotonic()
+        with self._bucket_lock:
+            done = [key for key, bucket in self._buckets.items()
+                    if force or now - bucket[0] >= COALESCE_WINDOW_S]
+            closed = [self._buckets.pop(key) for key in done]
+        for bucket in closed:
+            self._emit_summary(bucket, now)
     
     def log_permission_check(self, resource: str, action: str, 
                             granted: bool, user: str = "system"):
-        """Log a permission check"""
-        self.log(
-            action=f"permission_check:{action}",
-            category="permission",
-            details={"resource": resource, "granted": granted},
-            user=user,
-            success=granted
+        """Log a permission check (repeated grants are coalesced)"""
+        action = f"permission_check:{action}"
+        details = {"resource": resource, "granted": granted}
+        if not granted:
+            # Denials are security relevant; always log them individually
+            self.log(action, "permission", details, user, success=False)
+            return
+        self._log_coalesced(
+            ("permission", action, user, resource),
+            action, "permission", details, user, True
         )
     
     def log_data_access(self, data_type: str, operation: str, 
                        record_id: Optional[str] = None, user: str = "system"):
-        """Log data access"""
-        self.log(
-            action=f"data_access:{operation}",
-            category="data_access",
-            details={
-                "data_type": data_type,
-                "record_id": record_id or "bulk"
-            },
-            user=user,
-            success=True
+        """Log data access (repeated identical accesses are coalesced)"""
+        action = f"data_access:{operation}"
+        details = {
+            "data_type": data_type,
+            "record_id": record_id or "bulk"
+        }
+        self._log_coalesced(
+            ("data_access", action, user, data_type, details["record_id"]),
+            action, "data_access", details, user, True
         )
     
     def log_error(self, error_type: str, message: str, 
@@ -201,22 +415,43 @@ class AuditLogger:
             success=(severity != "critical")
         )
     
+    @staticmethod
+    def _read_lines_reversed(log_file: Path, block_size: int = 64 * 1024):
+        """Yield the file's lines newest-first, reading backwards in blocks"""
+        with open(log_file, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b''
+            while pos > 0:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                lines = (f.read(step) + tail).split(b'\n')
+                # First piece may be the end of a line in an earlier block
+                tail = lines.pop(0)
+                yield from reversed(lines)
+            yield tail
+    
     def get_recent_logs(self, hours: int = 24) -> list:
         """Get logs from the last N hours"""
-        cutoff = datetime.now() - timedelta(hours=hours)
+        # ISO timestamps sort lexicographically, so no per-line parsing
+        cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
         logs = []
+        self.flush()
         
         if self.current_log.exists():
-            with open(self.current_log, 'r') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        entry_time = datetime.fromisoformat(entry["timestamp"])
-                        if entry_time > cutoff:
-                            logs.append(entry)
-                    except (json.JSONDecodeError, KeyError):
-                        continue
+            # Entries are appended in time order; stop at the first old one
+            for line in self._read_lines_reversed(self.current_log):
+                if not line.strip():
+                    continue
+                try:
+                    entry = _loads(line)
+                    if entry["timestamp"] <= cutoff:
+                        break
+                    logs.append(entry)
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
         
+        # Already newest-first; this only fixes up entries racing across threads
         return sorted(logs, key=lambda x: x["timestamp"], reverse=True)
 
 
@@ -232,10 +467,14 @@ def get_audit_logger() -> AuditLogger:
     return _audit_logger
 
 
-def audit_action(category: str, action_name: Optional[str] = None):
+def audit_action(category: str, action_name: Optional[str] = None,
+                 capture_args: bool = True):
     """
     Decorator to automatically audit function calls
     
+    Arguments are recorded as truncated reprs; pass capture_args=False
+    to leave them out entirely.
+    
     Usage:
         @audit_action("data_access")
         def read_user_data(user_id):
@@ -252,19 +491,22 @@ def audit_action(category: str, action_name: Optional[str] = None):
                 logger.log(
                     action=action,
                     category=category,
-                    details={"args": str(args), "kwargs": str(kwargs)},
+                    details={
+                        "args": _arg_repr.repr(args),
+                        "kwargs": _arg_repr.repr(kwargs)
+                    } if capture_args else {},
                     success=True
                 )
                 return result
             except Exception as e:
+                details = {"error": str(e)}
+                if capture_args:
+                    details["args"] = _arg_repr.repr(args)
+                    details["kwargs"] = _arg_repr.repr(kwargs)
                 logger.log(
                     action=action,
                     category=category,
-                    details={
-                        "args": str(args),
-                        "kwargs": str(kwargs),
-                        "error": str(e)
-                    },
+                    details=details,
                     success=False
                 )
                 raise
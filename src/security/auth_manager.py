@@ -4,10 +4,17 @@ Authentication Manager
 Handles PIN verification, biometric auth, and session management.
 """
 
+import base64
 import hashlib
 import hmac
+import json
 import logging
+import os
 import secrets
+import shutil
+import sys
+import threading
+import time
 import asyncio
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -18,6 +25,10 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Short-lived memo of PIN verification results (repeat attempts skip PBKDF2)
+VERIFY_CACHE_TTL_S = 5.0
+VERIFY_CACHE_MAX = 64
+
 
 class AuthMethod(Enum):
     """Authentication methods."""
@@ -42,16 +53,31 @@ class AuthSession:
     method: AuthMethod
     level_granted: int  # 1-4
     created_at: datetime
-    expires_at: datetime
-    last_activity: datetime
     auth_token: str
+    expires_at_ns: int  # time.monotonic_ns() deadline
+    last_activity_ns: int  # time.monotonic_ns()
     biometric_verified: bool = False
+    
+    @staticmethod
+    def _wall_clock(monotonic_ns: int) -> datetime:
+        """Convert a monotonic_ns reading to local wall-clock time."""
+        return datetime.now() + timedelta(microseconds=(monotonic_ns - time.monotonic_ns()) // 1000)
+    
+    @property
+    def expires_at(self) -> datetime:
+        """Expiry as a datetime (for display and audit logs)."""
+        return self._wall_clock(self.expires_at_ns)
+    
+    @property
+    def last_activity(self) -> datetime:
+        """Last activity as a datetime (for display and audit logs)."""
+        return self._wall_clock(self.last_activity_ns)
 
 
-@dataclass
+@dataclass(slots=True)
 class FailedAttempt:
     """Failed authentication attempt record."""
-    timestamp: datetime
+    timestamp: float  # time.monotonic()
     method: AuthMethod
     reason: str
 
@@ -64,6 +90,7 @@ class BiometricAuth:
     """
     
     def __init__(self):
+        self._wsci = None  # Windows Hello API module, set by the availability probe
         self._available = self._check_availability()
         self._enrolled_users: Dict[int, str] = {}  # user_id -> biometric_hash
     
@@ -71,11 +98,11 @@ class BiometricAuth:
         """Check if biometric auth is available on system."""
         try:
             # Check for Windows Hello
-            import sys
             if sys.platform == "win32":
                 # Try to import Windows Hello APIs
                 try:
                     import winrt.windows.security.credentials.ui as wsci
+                    self._wsci = wsci
                     return True
                 except ImportError:
                     pass
@@ -90,13 +117,8 @@ class BiometricAuth:
             
             # Check for Linux fingerprint
             elif sys.platform == "linux":
-                # Check for fprintd
-                import subprocess
-                result = subprocess.run(
-                    ["which", "fprintd-verify"],
-                    capture_output=True
-                )
-                return result.returncode == 0
+                # Check for fprintd on PATH (no `which` subprocess)
+                return shutil.which("fprintd-verify") is not None
             
         except Exception as e:
             logger.debug(f"Biometric check failed: {e}")
@@ -121,8 +143,6 @@ class BiometricAuth:
             return False, "Biometric authentication not available"
         
         try:
-            import sys
-            
             if sys.platform == "win32":
                 return await self._auth_windows(user_id)
             elif sys.platform == "darwin":
@@ -139,7 +159,7 @@ class BiometricAuth:
     async def _auth_windows(self, user_id: int) -> Tuple[bool, str]:
         """Windows Hello authentication."""
         try:
-            import winrt.windows.security.credentials.ui as wsci
+            wsci = self._wsci
             
             # Request user verification
             result = await wsci.UserConsentVerifier.request_verification_async(
@@ -185,8 +205,6 @@ class BiometricAuth:
     async def _auth_linux(self, user_id: int) -> Tuple[bool, str]:
         """Linux fingerprint authentication."""
         try:
-            import subprocess
-            
             # Try to verify fingerprint
             result = await asyncio.create_subprocess_exec(
                 "fprintd-verify",
@@ -241,6 +259,7 @@ class AuthManager:
     ):
         self.pin_storage_path = pin_storage_path or Path("~/.closedclaw/pins.json").expanduser()
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
+        self._session_timeout_ns = session_timeout_minutes * 60 * 1_000_000_000
         self.max_failed_attempts = max_failed_attempts
         self.lockout_duration = timedelta(minutes=lockout_duration_minutes)
         self.audit_callback = audit_callback
@@ -249,53 +268,85 @@ class AuthManager:
         self._failed_attempts: Dict[int, list] = {}  # user_id -> list of FailedAttempt
         self._locked_users: Dict[int, datetime] = {}  # user_id -> lockout expiry
         self._pending_pins: Dict[int, str] = {}  # user_id -> partially entered PIN
+        self._pin_locks: Dict[int, asyncio.Lock] = {}  # user_id -> PIN attempt lock
         
         # Initialize biometric handler
         self.biometric = BiometricAuth()
         
-        # Load stored PINs
-        self._pins: Dict[int, str] = self._load_pins()
+        # Load stored PINs: user_id -> (salt, raw PBKDF2 key)
+        self._pins: Dict[int, Tuple[bytes, bytes]] = self._load_pins()
+        
+        # Verification memo keyed by a per-process HMAC of (user_id, pin),
+        # so the cache never holds PINs or anything useful offline
+        self._verify_cache_key = secrets.token_bytes(32)
+        self._verify_cache: Dict[bytes, Tuple[bool, float]] = {}
+        self._verify_cache_lock = threading.Lock()  # checks run in worker threads
         
         logger.info("AuthManager initialized")
     
-    def _load_pins(self) -> Dict[int, str]:
+    def _load_pins(self) -> Dict[int, Tuple[bytes, bytes]]:
         """Load PIN hashes from storage."""
         if not self.pin_storage_path.exists():
             return {}
         
         try:
-            import json
             with open(self.pin_storage_path, 'r') as f:
                 data = json.load(f)
-                return {int(k): v for k, v in data.items()}
         except Exception as e:
             logger.error(f"Failed to load PINs: {e}")
             return {}
+        
+        pins = {}
+        for user_id, stored in data.items():
+            try:
+                salt, encoded = stored.split("$")
+                if salt.endswith(":"):
+                    # Legacy "salt:$hexhash" entry
+                    pins[int(user_id)] = (salt[:-1].encode('utf-8'), bytes.fromhex(encoded))
+                else:
+                    pins[int(user_id)] = (
+                        salt.encode('utf-8'),
+                        base64.b64decode(encoded, validate=True)
+                    )
+            except Exception as e:
+                logger.error(f"Skipping malformed PIN entry for user {user_id}: {e}")
+        return pins
     
     def _save_pins(self):
-        """Save PIN hashes to storage."""
+        """Save PIN hashes to storage (atomically, via a temp file and rename)."""
+        tmp_path = self.pin_storage_path.with_suffix('.tmp')
         try:
-            import json
             self.pin_storage_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.pin_storage_path, 'w') as f:
-                json.dump(self._pins, f)
+            data = json.dumps({
+                user_id: f"{salt.decode('utf-8')}${base64.b64encode(key).decode('ascii')}"
+                for user_id, (salt, key) in self._pins.items()
+            })
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # A crash leaves either the old or the new file, never a torn one
+            os.replace(tmp_path, self.pin_storage_path)
         except Exception as e:
             logger.error(f"Failed to save PINs: {e}")
+            tmp_path.unlink(missing_ok=True)
     
-    def _hash_pin(self, pin: str, salt: Optional[str] = None) -> Tuple[str, str]:
-        """Hash PIN with salt."""
+    def _hash_pin(self, pin: str, salt: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+        """Hash PIN with salt, returning the raw key and the salt."""
         if salt is None:
-            salt = secrets.token_hex(16)
+            # Hex text so the stored form stays readable
+            salt = secrets.token_hex(16).encode('ascii')
         
         # Use PBKDF2 for secure hashing
         key = hashlib.pbkdf2_hmac(
             'sha256',
             pin.encode('utf-8'),
-            salt.encode('utf-8'),
+            salt,
             100000  # iterations
         )
         
-        return key.hex(), salt
+        return key, salt
     
     def set_pin(self, user_id: int, pin: str) -> bool:
         """
@@ -313,7 +364,9 @@ class AuthManager:
             return False
         
         hashed_pin, salt = self._hash_pin(pin)
-        self._pins[user_id] = f"{salt}:${hashed_pin}"
+        self._pins[user_id] = (salt, hashed_pin)
+        with self._verify_cache_lock:
+            self._verify_cache.clear()
         self._save_pins()
         
         self._audit("PIN_SET", {"user_id": user_id})
@@ -331,26 +384,80 @@ class AuthManager:
         Returns:
             True if PIN is correct
         """
+        stored = self._stored_pin(user_id)
+        if stored is None:
+            return False
+        
+        return self._pin_result(user_id, self._check_pin(user_id, pin, stored))
+    
+    async def verify_pin_async(self, user_id: int, pin: str) -> bool:
+        """
+        Verify user PIN without blocking the event loop.
+        
+        PBKDF2 runs in a worker thread (OpenSSL releases the GIL); the
+        lockout and session bookkeeping stays on the loop. Attempts for the
+        same user are serialized so each failure counts before the next
+        attempt's lockout check.
+        """
+        lock = self._pin_locks.get(user_id)
+        if lock is None:
+            lock = self._pin_locks[user_id] = asyncio.Lock()
+        
+        async with lock:
+            stored = self._stored_pin(user_id)
+            if stored is None:
+                return False
+            
+            matched = await asyncio.to_thread(self._check_pin, user_id, pin, stored)
+            return self._pin_result(user_id, matched)
+    
+    def _stored_pin(self, user_id: int) -> Optional[Tuple[bytes, bytes]]:
+        """Return the stored (salt, key) for a user allowed to try a PIN."""
         if self.is_locked(user_id):
             logger.warning(f"User {user_id} is locked out")
-            return False
+            return None
         
         stored = self._pins.get(user_id)
         if not stored:
             logger.warning(f"No PIN set for user {user_id}")
             self._record_failure(user_id, AuthMethod.PIN, "No PIN set")
-            return False
-        
-        salt, stored_hash = stored.split("$")
-        computed_hash, _ = self._hash_pin(pin, salt)
+            return None
         
-        if hmac.compare_digest(computed_hash, stored_hash):
+        return stored
+    
+    def _pin_result(self, user_id: int, matched: bool) -> bool:
+        """Record the outcome of a PIN check."""
+        if matched:
             self._record_success(user_id, AuthMethod.PIN)
             return True
         else:
             self._record_failure(user_id, AuthMethod.PIN, "Invalid PIN")
             return False
     
+    def _check_pin(self, user_id: int, pin: str, stored: Tuple[bytes, bytes]) -> bool:
+        """Run PBKDF2 for a PIN, reusing a result from the last few seconds."""
+        cache_key = hmac.new(
+            self._verify_cache_key, f"{user_id}:{pin}".encode('utf-8'), 'sha256'
+        ).digest()[:16]
+        now = time.monotonic()
+        
+        with self._verify_cache_lock:
+            cached = self._verify_cache.get(cache_key)
+        if cached and now - cached[1] < VERIFY_CACHE_TTL_S:
+            return cached[0]
+        
+        salt, stored_hash = stored
+        computed_hash, _ = self._hash_pin(pin, salt)
+        
+        # Compare the 32 raw key bytes rather than 64 hex chars
+        result = hmac.compare_digest(computed_hash, stored_hash)
+        
+        with self._verify_cache_lock:
+            if len(self._verify_cache) >= VERIFY_CACHE_MAX:
+                self._verify_cache.pop(next(iter(self._verify_cache)), None)
+            self._verify_cache[cache_key] = (result, now)
+        return result
+    
     async def authenticate(
         self,
         user_id: int,
@@ -375,7 +482,7 @@ class AuthManager:
             if not credential:
                 return AuthStatus.PENDING, None
             
-            if self.verify_pin(user_id, credential):
+            if await self.verify_pin_async(user_id, credential):
                 session = self._create_session(user_id, method, level=2)
                 return AuthStatus.SUCCESS, session
             else:
@@ -405,15 +512,15 @@ class AuthManager:
         level: int
     ) -> AuthSession:
         """Create new authentication session."""
-        now = datetime.now()
+        now_ns = time.monotonic_ns()
         session = AuthSession(
             user_id=user_id,
             method=method,
             level_granted=level,
-            created_at=now,
-            expires_at=now + self.session_timeout,
-            last_activity=now,
-            auth_token=secrets.token_urlsafe(32)
+            created_at=datetime.now(),
+            auth_token=secrets.token_urlsafe(32),
+            expires_at_ns=now_ns + self._session_timeout_ns,
+            last_activity_ns=now_ns
         )
         
         self._sessions[user_id] = session
@@ -445,14 +552,15 @@ class AuthManager:
         if session.auth_token != token:
             return None
         
-        if datetime.now() > session.expires_at:
+        now_ns = time.monotonic_ns()
+        if now_ns > session.expires_at_ns:
             self._sessions.pop(user_id, None)
             self._audit("SESSION_EXPIRED", {"user_id": user_id})
             return None
         
         # Extend session on activity
-        session.last_activity = datetime.now()
-        session.expires_at = datetime.now() + self.session_timeout
+        session.last_activity_ns = now_ns
+        session.expires_at_ns = now_ns + self._session_timeout_ns
         
         return session
     
@@ -465,10 +573,11 @@ class AuthManager:
     
     def is_locked(self, user_id: int) -> bool:
         """Check if user is locked out."""
-        if user_id not in self._locked_users:
+        lockout_until = self._locked_users.get(user_id)
+        if lockout_until is None:
             return False
         
-        if datetime.now() > self._locked_users[user_id]:
+        if datetime.now() > lockout_until:
             # Lockout expired
             del self._locked_users[user_id]
             self._failed_attempts[user_id] = []
@@ -486,7 +595,7 @@ class AuthManager:
             self._failed_attempts[user_id] = []
         
         attempt = FailedAttempt(
-            timestamp=datetime.now(),
+            timestamp=time.monotonic(),
             method=method,
             reason=reason
         )
@@ -534,7 +643,7 @@ class AuthManager:
     def get_auth_level(self, user_id: int) -> int:
         """Get current auth level for user."""
         session = self._sessions.get(user_id)
-        if session and datetime.now() <= session.expires_at:
+        if session and time.monotonic_ns() <= session.expires_at_ns:
             return session.level_granted
         return 0
     
@@ -5,12 +5,32 @@ Blocks access to banking apps, financial SMS, and UPI data
 
 import os
 import re
-from typing import List, Set, Dict, Optional, Tuple
+import time
+from typing import ClassVar, List, FrozenSet, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 import logging
 
+# SIMD multi-pattern matcher for the SMS patterns (optional)
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# C-backed Aho-Corasick automaton for keyword/package scans (optional)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+@lru_cache(maxsize=1024)
+def _lower(package_name: str) -> str:
+    """Lowercase a package name; the same few apps are checked repeatedly"""
+    return package_name.lower()
+
 
 class AlertLevel(Enum):
     """Security alert levels"""
@@ -19,10 +39,10 @@ class AlertLevel(Enum):
     CRITICAL = "critical"
 
 
-@dataclass
+@dataclass(slots=True)
 class SecurityAlert:
     """Security alert data structure"""
-    timestamp: str
+    timestamp: float  # Unix time
     level: AlertLevel
     category: str
     message: str
@@ -41,7 +61,8 @@ class BankingBlocker:
     """
     
     # Blocked banking and payment apps (package names and directories)
-    BLOCKED_APPS: Set[str] = {
+    # All entries are stored lowercase, matching the lowered lookups
+    BLOCKED_APPS: ClassVar[FrozenSet[str]] = frozenset({
         # UPI Apps
         "com.phonepe.app", "com.phonepe.app.v4",
         "com.google.android.apps.nbu.paisa.user",  # GPay
@@ -49,14 +70,14 @@ class BankingBlocker:
         "in.org.npci.upiapp",  # BHIM
         "com.cred.app", "com.dreamplug.androidapp",
         "com.mobikwik_new", "com.freecharge.android",
-        "in.amazon.mShop.android.shopping",  # Amazon Pay
+        "in.amazon.mshop.android.shopping",  # Amazon Pay
         "com.paypal.android.p2pmobile",
         "com.hdfcbank.payzapp",
         "com.samsung.android.samsungpay",
         
         # Banking Apps
         "com.snapwork.hdfc", "com.hdfcbank.mobilebanking",
-        "com.sbi.SBIFreedomPlus", "com.sbi.lotusintouch",
+        "com.sbi.sbifreedomplus", "com.sbi.lotusintouch",
         "com.icicibank.iciciapp", "com.icicibank.imobile",
         "com.axis.mobile", "com.axis.netbanking",
         "com.kotak.kotakmobilebanking",
@@ -72,10 +93,10 @@ class BankingBlocker:
         "com.whatsapp.w4b",  # WhatsApp Business
         "com.google.android.apps.walletnfcrel",
         "com.samsung.android.spaymini",
-    }
+    })
     
     # Blocked app display names (for detection)
-    BLOCKED_APP_NAMES: Set[str] = {
+    BLOCKED_APP_NAMES: ClassVar[FrozenSet[str]] = frozenset({
         "phonepe", "google pay", "gpay", "paytm",
         "bhim", "cred", "mobikwik", "freecharge",
         "amazon pay", "paypal", "payzapp", "samsung pay",
@@ -83,19 +104,19 @@ class BankingBlocker:
         "pnb", "bob", "bank of baroda", "canara bank",
         "union bank", "idbi", "yes bank", "bandhan bank",
         "upi", "wallet", "tez", "lime", "pingpay",
-    }
+    })
     
     # UPI-related keywords to block
-    UPI_KEYWORDS: Set[str] = {
+    UPI_KEYWORDS: ClassVar[FrozenSet[str]] = frozenset({
         "upi", "vpa", "virtual payment address",
         "@oksbi", "@okhdfcbank", "@okicici", "@okaxis",
         "@paytm", "@upi", "@ybl", "@ibl",
         "@kotak", "@axl", "@apl", "@indus",
         "upi pin", "upi id", "qr code payment",
         "scan and pay", "upi transaction",
-    }
+    })
     
-    # Financial SMS patterns
+    # Financial SMS patterns (lowercase; matched against lowered text)
     FINANCIAL_SMS_PATTERNS: List[str] = [
         r"\b(?:rs|inr|₹)\s*\.?\s*[\d,]+(?:\.\d{2})?\b",  # Currency amounts
         r"\b(?:credited|debited|withdrawn|transferred)\b",
@@ -106,32 +127,97 @@ class BankingBlocker:
         r"\b(?:otp|one.?time.?password)\s*(?:is)?[:\s]*\d+",
     ]
     
-    # Sensitive data patterns
+    # Sensitive data patterns (written lowercase; scans run on lowered text)
     SENSITIVE_PATTERNS: Dict[str, str] = {
         "account_number": r"\b\d{9,18}\b",
         "card_number": r"\b(?:\d{4}[-\s]?){3}\d{4}\b",
         "cvv": r"\bcvv[:\s]*\d{3,4}\b",
         "otp": r"\b(?:otp|pin)[:\s]*\d{4,6}\b",
         "upi_id": r"\b[\w.-]+@[\w]+\b",
-        "ifsc": r"\b[A-Z]{4}0[A-Z0-9]{6}\b",
+        "ifsc": r"\b[a-z]{4}0[a-z0-9]{6}\b",
     }
     
+    # Sensitive types that need a run of at least 4 digits to match
+    DIGIT_RUN_TYPES: ClassVar[FrozenSet[str]] = frozenset({
+        "account_number", "card_number", "otp",
+    })
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._alert_handlers: List[callable] = []
         self._block_count = 0
         
-        # Compile SMS patterns
+        # Compile SMS patterns; detection runs on lowered text, so no
+        # IGNORECASE case folding per character
         self._sms_patterns = [
-            re.compile(p, re.IGNORECASE) 
+            re.compile(p) 
             for p in self.FINANCIAL_SMS_PATTERNS
         ]
         
-        # Compile sensitive patterns
+        # Same patterns as one alternation for the re path; group i is pattern i
+        self._sms_union = re.compile(
+            "|".join(f"({p})" for p in self.FINANCIAL_SMS_PATTERNS)
+        )
+        
+        # All SMS patterns in one Hyperscan database: a single pass reports
+        # which of them occur anywhere in the message
+        self._sms_db = self._compile_sms_db(tuple(self.FINANCIAL_SMS_PATTERNS))
+        
+        # Substring scans over the blocked packages and UPI keywords
+        self._app_ac = self._build_automaton(self.BLOCKED_APPS)
+        self._upi_ac = self._build_automaton(self.UPI_KEYWORDS)
+        self._blocked_apps_joined = "\0".join(self.BLOCKED_APPS)
+        
+        # Compile sensitive patterns (for counting on lowered text)
         self._sensitive_patterns = {
-            k: re.compile(v, re.IGNORECASE)
+            k: re.compile(v)
             for k, v in self.SENSITIVE_PATTERNS.items()
         }
+        
+        # Cheap gate for DIGIT_RUN_TYPES: one scan instead of three
+        self._digit_run = re.compile(r"\d{4}")
+        
+        # Same patterns as one alternation, so redaction is a single pass;
+        # redaction must keep the original text, so this one stays caseless
+        self._combined_sensitive = re.compile(
+            "|".join(f"(?P<{k}>{v})" for k, v in self.SENSITIVE_PATTERNS.items()),
+            re.IGNORECASE
+        )
+    
+    # The builders below are cached so every blocker in the process shares
+    # one compiled database/automaton (both are read-only once built)
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _compile_sms_db(patterns: Tuple[str, ...]):
+        """Build a Hyperscan database for the SMS patterns, or None without hyperscan"""
+        if hyperscan is None:
+            return None
+        try:
+            db = hyperscan.Database()
+            flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_SINGLEMATCH
+            db.compile(
+                expressions=[p.encode('utf-8') for p in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[flags] * len(patterns)
+            )
+            return db
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Hyperscan unavailable, using re: {e}")
+            return None
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _build_automaton(words: FrozenSet[str]):
+        """Build an Aho-Corasick automaton over words, or None without pyahocorasick"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for word in words:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        return automaton
     
     def add_alert_handler(self, handler: callable):
         """Add handler for security alerts"""
@@ -141,7 +227,7 @@ class BankingBlocker:
                       message: str, details: Dict):
         """Trigger security alert"""
         alert = SecurityAlert(
-            timestamp=datetime.now().isoformat(),
+            timestamp=time.time(),
             level=level,
             category=category,
             message=message,
@@ -158,18 +244,21 @@ class BankingBlocker:
     
     def is_banking_app(self, package_name: str) -> bool:
         """Check if package is a banking/payment app"""
-        pkg_lower = package_name.lower()
+        pkg_lower = _lower(package_name)
         
         # Check exact matches
         if pkg_lower in self.BLOCKED_APPS:
             return True
         
-        # Check partial matches
-        for blocked in self.BLOCKED_APPS:
-            if blocked in pkg_lower or pkg_lower in blocked:
+        # Check partial matches: a blocked package inside the name...
+        if self._app_ac is not None:
+            if next(self._app_ac.iter(pkg_lower), None) is not None:
                 return True
+        elif any(blocked in pkg_lower for blocked in self.BLOCKED_APPS):
+            return True
         
-        return False
+        # ...or the name inside a blocked package (NUL never occurs in names)
+        return pkg_lower in self._blocked_apps_joined
     
     def check_app_access(self, package_name: str, 
                         action: str = "access") -> Tuple[bool, Optional[str]]:
@@ -198,12 +287,15 @@ class BankingBlocker:
         Returns:
             (has_keywords, found_keywords) tuple
         """
-        text_lower = text.lower()
-        found = []
-        
-        for keyword in self.UPI_KEYWORDS:
-            if keyword in text_lower:
-                found.append(keyword)
+        return self._find_upi_keywords(text.lower())
+    
+    def _find_upi_keywords(self, text_lower: str) -> Tuple[bool, List[str]]:
+        """contains_upi_keywords on already-lowered text"""
+        if self._upi_ac is not None:
+            # One pass; keep each keyword once, in order of first occurrence
+            found = list(dict.fromkeys(kw for _, kw in self._upi_ac.iter(text_lower)))
+        else:
+            found = [kw for kw in self.UPI_KEYWORDS if kw in text_lower]
         
         return len(found) > 0, found
     
@@ -214,11 +306,28 @@ class BankingBlocker:
         Returns:
             (is_financial, confidence_score) tuple
         """
-        matches = 0
-        
-        for pattern in self._sms_patterns:
-            if pattern.search(message):
-                matches += 1
+        return self._check_financial_sms(message.lower())
+    
+    def _check_financial_sms(self, message: str) -> Tuple[bool, float]:
+        """is_financial_sms on already-lowered text"""
+        if self._sms_db is not None:
+            # SINGLEMATCH reports each pattern id at most once
+            hits = set()
+            self._sms_db.scan(
+                message.encode('utf-8'),
+                match_event_handler=lambda pattern_id, *_: hits.add(pattern_id)
+            )
+            matches = len(hits)
+        else:
+            hits = {m.lastindex for m in self._sms_union.finditer(message)}
+            if hits:
+                # finditer skips patterns that only match inside an earlier
+                # hit, so re-check the ones not seen yet
+                hits.update(
+                    i for i, pattern in enumerate(self._sms_patterns, 1)
+                    if i not in hits and pattern.search(message)
+                )
+            matches = len(hits)
         
         confidence = matches / len(self._sms_patterns)
         is_financial = confidence > 0.3 or matches >= 2
@@ -240,17 +349,9 @@ class BankingBlocker:
         Returns:
             Text with sensitive data replaced
         """
-        redacted = text
-        
-        for data_type, pattern in self._sensitive_patterns.items():
-            redacted = pattern.sub(f"[{data_type.upper()}_REDACTED]", redacted)
-        
-        # Also redact UPI IDs
-        upi_pattern = self._sensitive_patterns.get("upi_id")
-        if upi_pattern:
-            redacted = upi_pattern.sub("[UPI_ID_REDACTED]", redacted)
-        
-        return redacted
+        return self._combined_sensitive.sub(
+            lambda m: f"[{m.lastgroup.upper()}_REDACTED]", text
+        )
     
     def scan_text(self, text: str) -> Dict:
         """
@@ -259,8 +360,23 @@ class BankingBlocker:
         Returns:
             Scan report dictionary
         """
+        return self.scan_texts([text])[0]
+    
+    def scan_texts(self, texts: List[str]) -> List[Dict]:
+        """
+        Scan a batch of texts (e.g. a whole SMS inbox) for financial data
+        
+        Returns:
+            One scan report per text, in order
+        """
+        # One timestamp for the batch; the compiled matchers are shared
+        timestamp = datetime.now().isoformat()
+        return [self._scan_lowered(text.lower(), timestamp) for text in texts]
+    
+    def _scan_lowered(self, text_lower: str, timestamp: str) -> Dict:
+        """scan_text on already-lowered text"""
         report = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "has_upi_keywords": False,
             "upi_keywords_found": [],
             "is_financial_sms": False,
@@ -270,18 +386,22 @@ class BankingBlocker:
         }
         
         # Check UPI keywords
-        has_upi, keywords = self.contains_upi_keywords(text)
+        has_upi, keywords = self._find_upi_keywords(text_lower)
         report["has_upi_keywords"] = has_upi
         report["upi_keywords_found"] = keywords
         
         # Check for financial SMS patterns
-        is_financial, confidence = self.is_financial_sms(text)
+        is_financial, confidence = self._check_financial_sms(text_lower)
         report["is_financial_sms"] = is_financial
         report["financial_sms_confidence"] = confidence
         
-        # Check for sensitive data
+        # Check for sensitive data; most text has no 4-digit run, and then
+        # the account/card/OTP patterns cannot match anywhere
+        has_digit_run = self._digit_run.search(text_lower) is not None
         for data_type, pattern in self._sensitive_patterns.items():
-            matches = pattern.findall(text)
+            if not has_digit_run and data_type in self.DIGIT_RUN_TYPES:
+                continue
+            matches = pattern.findall(text_lower)
             if matches:
                 report["sensitive_data_found"][data_type] = len(matches)
         
@@ -4,18 +4,29 @@ Permission System
 L1-L4 permission levels for granular access control.
 """
 
+import asyncio
+import atexit
+import heapq
+import inspect
 import logging
+import queue
+import sys
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from enum import Enum
-from typing import Dict, List, Optional, Callable, Any
+from enum import IntEnum
+from typing import Dict, FrozenSet, List, Optional, Callable, Any, Set, Tuple
 from functools import wraps
 
 
 logger = logging.getLogger(__name__)
 
+# Most audit events handed to the callback per writer-thread wakeup
+AUDIT_BATCH_MAX = 256
+
 
-class PermissionLevel(Enum):
+class PermissionLevel(IntEnum):
     """
     Permission levels from L1 (lowest) to L4 (highest).
     
@@ -23,6 +34,8 @@ class PermissionLevel(Enum):
     L2: PIN - Read sensitive data (WhatsApp, SMS)
     L3: Confirm - Write/modify data (Calendar, Files)
     L4: Confirm+Delay - High-risk actions (Calls, System)
+    
+    Levels are ints, so they compare directly (L2_PIN < L3_CONFIRM).
     """
     L1_AUTO = 1
     L2_PIN = 2
@@ -51,15 +64,15 @@ class PermissionAction:
     audit_log: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class UserPermissions:
     """User permission state."""
     user_id: int
     current_level: PermissionLevel = PermissionLevel.L1_AUTO
-    granted_at: Optional[datetime] = None
-    expires_at: Optional[datetime] = None
-    confirmed_actions: List[str] = field(default_factory=list)
-    pending_confirmations: Dict[str, datetime] = field(default_factory=dict)
+    granted_at: Optional[float] = None  # time.monotonic()
+    expires_at: Optional[float] = None  # time.monotonic() deadline
+    confirmed_actions: Set[str] = field(default_factory=set)
+    pending_confirmations: Dict[str, float] = field(default_factory=dict)  # action -> time.monotonic()
 
 
 class PermissionManager:
@@ -107,18 +120,53 @@ class PermissionManager:
         audit_callback: Optional[Callable[[str, Any], None]] = None
     ):
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
+        self._session_timeout_s = session_timeout_minutes * 60.0
         self.audit_callback = audit_callback
         
-        self._actions: Dict[str, PermissionAction] = dict(self.DEFAULT_ACTIONS)
+        self._actions: Dict[str, PermissionAction] = {}
+        # Actions also get a small int id; decorated functions resolve the
+        # id once and index the table instead of hashing the name per call
+        self._action_ids: Dict[str, int] = {}
+        self._action_table: List[PermissionAction] = []
+        # L1 actions without confirmation need no session state at all
+        self._l1_actions: FrozenSet[str] = frozenset()
+        for action in self.DEFAULT_ACTIONS.values():
+            self._add_action(action)
         self._user_sessions: Dict[int, UserPermissions] = {}
+        # (expires_at, user_id) min-heap; entries go stale when a level is re-set
+        self._expiry_heap: List[Tuple[float, int]] = []
         self._confirmation_callbacks: Dict[str, Callable] = {}
         
+        # Audit events go to audit_callback from a background thread, so a
+        # permission check only pays for a queue put
+        self._audit_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._audit_thread: Optional[threading.Thread] = None
+        self._audit_thread_lock = threading.Lock()
+        
         logger.info("PermissionManager initialized")
     
+    def _add_action(self, action: PermissionAction) -> int:
+        """Store an action, reusing the id of one it replaces."""
+        action.name = sys.intern(action.name)
+        self._actions[action.name] = action
+        action_id = self._action_ids.get(action.name)
+        if action_id is None:
+            action_id = len(self._action_table)
+            self._action_ids[action.name] = action_id
+            self._action_table.append(action)
+        else:
+            self._action_table[action_id] = action
+        
+        self._l1_actions = frozenset(
+            name for name, a in self._actions.items()
+            if a.level is PermissionLevel.L1_AUTO and not a.requires_confirmation
+        )
+        return action_id
+    
     def register_action(self, action: PermissionAction):
         """Register a new permission action."""
-        self._actions[action.name] = action
-        logger.debug(f"Registered action: {action.name} -> {action.level.name}")
+        self._add_action(action)
+        logger.debug("Registered action: %s -> %s", action.name, action.level.name)
     
     def get_action(self, action_name: str) -> Optional[PermissionAction]:
         """Get action definition by name."""
@@ -146,28 +194,54 @@ class PermissionManager:
         """
         action = self._actions.get(action_name)
         if not action:
-            logger.warning(f"Unknown action: {action_name}")
+            logger.warning("Unknown action: %s", action_name)
             raise PermissionDenied(
                 PermissionLevel.L1_AUTO,
                 PermissionLevel.L1_AUTO,
                 f"Unknown action: {action_name}"
             )
         
-        user_perms = self._get_user_permissions(user_id)
+        return self._check_action(user_id, action, auto_confirm)
+    
+    def get_action_id(self, action_name: str) -> Optional[int]:
+        """Get the int id of a registered action (for check_permission_by_id)."""
+        return self._action_ids.get(action_name)
+    
+    def check_permission_by_id(
+        self,
+        user_id: int,
+        action_id: int,
+        auto_confirm: bool = False
+    ) -> bool:
+        """check_permission for an action id from get_action_id."""
+        return self._check_action(user_id, self._action_table[action_id], auto_confirm)
+    
+    def _check_action(
+        self,
+        user_id: int,
+        action: PermissionAction,
+        auto_confirm: bool
+    ) -> bool:
+        """Permission check for a resolved action (see check_permission)."""
+        action_name = action.name
         
-        # Check if session expired
-        if user_perms.expires_at and datetime.now() > user_perms.expires_at:
-            logger.info(f"Session expired for user {user_id}")
-            user_perms.current_level = PermissionLevel.L1_AUTO
-            user_perms.granted_at = None
-            user_perms.expires_at = None
+        # Fast path for L1: no level, expiry or confirmation to check
+        if action_name in self._l1_actions:
+            if action.audit_log:
+                self._audit_allowed(user_id, action)
+            return True
+        
+        # Drop any sessions that have expired
+        if self._expiry_heap:
+            self._reap_expired()
+        
+        user_perms = self._get_user_permissions(user_id)
         
         # Check level
-        if user_perms.current_level.value < action.level.value:
+        if user_perms.current_level < action.level:
             logger.warning(
-                f"Permission denied for user {user_id}: "
-                f"{action_name} requires {action.level.name}, "
-                f"user has {user_perms.current_level.name}"
+                "Permission denied for user %s: %s requires %s, user has %s",
+                user_id, action_name, action.level.name, user_perms.current_level.name
             )
             raise PermissionDenied(action.level, user_perms.current_level)
         
@@ -177,12 +251,12 @@ class PermissionManager:
                 # Check if pending
                 if action_name in user_perms.pending_confirmations:
                     # Check delay for L4
-                    if action.level == PermissionLevel.L4_CONFIRM_DELAY:
+                    if action.level is PermissionLevel.L4_CONFIRM_DELAY:
                         pending_time = user_perms.pending_confirmations[action_name]
-                        elapsed = (datetime.now() - pending_time).total_seconds()
+                        elapsed = time.monotonic() - pending_time
                         if elapsed < action.delay_seconds:
                             remaining = action.delay_seconds - elapsed
-                            logger.info(f"Delay pending for {action_name}: {remaining:.0f}s remaining")
+                            logger.info("Delay pending for %s: %.0fs remaining", action_name, remaining)
                             raise PermissionDenied(
                                 action.level,
                                 user_perms.current_level,
@@ -191,19 +265,23 @@ class PermissionManager:
                     return True  # Ready to confirm
                 else:
                     # Needs confirmation
-                    logger.info(f"Confirmation required for {action_name}")
+                    logger.info("Confirmation required for %s", action_name)
                     return False
         
         # Audit log
         if action.audit_log:
-            self._audit_log(f"ACTION_ALLOWED", {
-                "user_id": user_id,
-                "action": action_name,
-                "level": action.level.name
-            })
+            self._audit_allowed(user_id, action)
         
         return True
     
+    def _audit_allowed(self, user_id: int, action: PermissionAction):
+        """Audit an allowed action."""
+        self._audit_log("ACTION_ALLOWED", {
+            "user_id": user_id,
+            "action": action.name,
+            "level": action.level.name
+        })
+    
     def request_confirmation(self, user_id: int, action_name: str) -> bool:
         """
         Request user confirmation for action.
@@ -222,15 +300,15 @@ class PermissionManager:
         user_perms = self._get_user_permissions(user_id)
         
         # Set pending confirmation
-        user_perms.pending_confirmations[action_name] = datetime.now()
+        user_perms.pending_confirmations[action_name] = time.monotonic()
         
         self._audit_log("CONFIRMATION_REQUESTED", {
             "user_id": user_id,
             "action": action_name,
-            "delay": action.delay_seconds if action.level == PermissionLevel.L4_CONFIRM_DELAY else 0
+            "delay": action.delay_seconds if action.level is PermissionLevel.L4_CONFIRM_DELAY else 0
         })
         
-        logger.info(f"Confirmation requested for {action_name} by user {user_id}")
+        logger.info("Confirmation requested for %s by user %s", action_name, user_id)
         return True
     
     def confirm_action(self, user_id: int, action_name: str) -> bool:
@@ -247,7 +325,7 @@ class PermissionManager:
         user_perms = self._get_user_permissions(user_id)
         
         if action_name not in user_perms.pending_confirmations:
-            logger.warning(f"No pending confirmation for {action_name}")
+            logger.warning("No pending confirmation for %s", action_name)
             return False
         
         action = self._actions.get(action_name)
@@ -255,15 +333,15 @@ class PermissionManager:
             return False
         
         # Check delay for L4
-        if action.level == PermissionLevel.L4_CONFIRM_DELAY:
+        if action.level is PermissionLevel.L4_CONFIRM_DELAY:
             pending_time = user_perms.pending_confirmations[action_name]
-            elapsed = (datetime.now() - pending_time).total_seconds()
+            elapsed = time.monotonic() - pending_time
             if elapsed < action.delay_seconds:
-                logger.warning(f"Confirmation too early for {action_name}")
+                logger.warning("Confirmation too early for %s", action_name)
                 return False
         
         # Mark as confirmed
-        user_perms.confirmed_actions.append(action_name)
+        user_perms.confirmed_actions.add(action_name)
         del user_perms.pending_confirmations[action_name]
         
         self._audit_log("ACTION_CONFIRMED", {
@@ -271,7 +349,7 @@ class PermissionManager:
             "action": action_name
         })
         
-        logger.info(f"Action {action_name} confirmed by user {user_id}")
+        logger.info("Action %s confirmed by user %s", action_name, user_id)
         return True
     
     def cancel_confirmation(self, user_id: int, action_name: str):
@@ -300,34 +378,53 @@ class PermissionManager:
         """
         user_perms = self._get_user_permissions(user_id)
         user_perms.current_level = level
-        user_perms.granted_at = datetime.now()
+        now = time.monotonic()
+        user_perms.granted_at = now
         
-        timeout = timedelta(minutes=duration_minutes) if duration_minutes else self.session_timeout
-        user_perms.expires_at = datetime.now() + timeout
+        timeout_s = duration_minutes * 60.0 if duration_minutes else self._session_timeout_s
+        user_perms.expires_at = now + timeout_s
+        heapq.heappush(self._expiry_heap, (user_perms.expires_at, user_id))
         
         # Clear confirmations when level changes
         user_perms.confirmed_actions.clear()
         user_perms.pending_confirmations.clear()
         
-        self._audit_log("LEVEL_CHANGED", {
-            "user_id": user_id,
-            "new_level": level.name,
-            "expires": user_perms.expires_at.isoformat()
-        })
+        # Only build the audit record (and its ISO timestamp) if it is consumed
+        if self.audit_callback or logger.isEnabledFor(logging.INFO):
+            self._audit_log("LEVEL_CHANGED", {
+                "user_id": user_id,
+                "new_level": level.name,
+                "expires": datetime.fromtimestamp(time.time() + timeout_s).isoformat()
+            })
         
-        logger.info(f"User {user_id} level set to {level.name}")
+        logger.info("User %s level set to %s", user_id, level.name)
     
     def clear_user_session(self, user_id: int):
         """Clear user's session."""
         if user_id in self._user_sessions:
             del self._user_sessions[user_id]
             self._audit_log("SESSION_CLEARED", {"user_id": user_id})
-            logger.info(f"Session cleared for user {user_id}")
+            logger.info("Session cleared for user %s", user_id)
     
     def get_user_level(self, user_id: int) -> PermissionLevel:
         """Get user's current permission level."""
         return self._get_user_permissions(user_id).current_level
     
+    def _reap_expired(self):
+        """Reset users whose session has expired back to L1."""
+        now = time.monotonic()
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires_at, user_id = heapq.heappop(heap)
+            user_perms = self._user_sessions.get(user_id)
+            # Skip entries superseded by a later set_user_level or clear
+            if user_perms is None or user_perms.expires_at != expires_at:
+                continue
+            logger.info("Session expired for user %s", user_id)
+            user_perms.current_level = PermissionLevel.L1_AUTO
+            user_perms.granted_at = None
+            user_perms.expires_at = None
+    
     def _get_user_permissions(self, user_id: int) -> UserPermissions:
         """Get or create user permissions."""
         if user_id not in self._user_sessions:
@@ -337,12 +434,50 @@ class PermissionManager:
     def _audit_log(self, event: str, data: dict):
         """Send audit log."""
         if self.audit_callback:
-            try:
-                self.audit_callback(event, data)
-            except Exception as e:
-                logger.error(f"Audit log failed: {e}")
+            if self._audit_thread is None:
+                self._start_audit_thread()
+            self._audit_queue.put((event, data))
         
-        logger.info(f"AUDIT: {event} - {data}")
+        logger.info("AUDIT: %s - %s", event, data)
+    
+    def _start_audit_thread(self):
+        """Start the audit delivery thread on first use."""
+        with self._audit_thread_lock:
+            if self._audit_thread is None:
+                self._audit_thread = threading.Thread(
+                    target=self._drain_audit, name="permission-audit", daemon=True
+                )
+                self._audit_thread.start()
+                atexit.register(self.flush_audit)
+    
+    def _drain_audit(self):
+        """Audit thread: hand queued events to audit_callback in batches."""
+        while True:
+            batch = [self._audit_queue.get()]
+            while len(batch) < AUDIT_BATCH_MAX:
+                try:
+                    batch.append(self._audit_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                    continue
+                callback = self.audit_callback
+                if callback:
+                    try:
+                        callback(*item)
+                    except Exception as e:
+                        logger.error("Audit log failed: %s", e)
+    
+    def flush_audit(self, timeout: float = 5.0):
+        """Block until audit events queued so far have been delivered."""
+        if self._audit_thread is None or not self._audit_thread.is_alive():
+            return
+        done = threading.Event()
+        self._audit_queue.put(done)
+        done.wait(timeout)
     
     def require_permission(self, action_name: str):
         """
@@ -354,43 +489,46 @@ class PermissionManager:
                 ...
         """
         def decorator(func: Callable) -> Callable:
-            @wraps(func)
-            async def async_wrapper(*args, **kwargs):
-                # Extract user_id from args or kwargs
+            # Resolve the action id once; unknown names keep the by-name
+            # path so they still fail with "Unknown action" at call time
+            action_id = self._action_ids.get(action_name)
+            
+            # Find where user_id sits positionally once, not per call
+            # (first argument if the function has no user_id parameter)
+            try:
+                uid_pos = list(inspect.signature(func).parameters).index('user_id')
+            except (ValueError, TypeError):
+                uid_pos = 0
+            
+            def guard(args, kwargs):
                 user_id = kwargs.get('user_id')
-                if not user_id and len(args) > 0:
-                    user_id = args[0]
+                if not user_id and len(args) > uid_pos:
+                    user_id = args[uid_pos]
                 
                 if not user_id:
                     raise ValueError("user_id required for permission check")
                 
-                if self.check_permission(user_id, action_name):
-                    return await func(*args, **kwargs)
+                if action_id is None:
+                    allowed = self.check_permission(user_id, action_name)
                 else:
+                    allowed = self.check_permission_by_id(user_id, action_id)
+                
+                if not allowed:
                     raise PermissionDenied(
                         self._actions[action_name].level,
                         self.get_user_level(user_id)
                     )
             
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    guard(args, kwargs)
+                    return await func(*args, **kwargs)
+                return async_wrapper
+            
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
-                user_id = kwargs.get('user_id')
-                if not user_id and len(args) > 0:
-                    user_id = args[0]
-                
-                if not user_id:
-                    raise ValueError("user_id required for permission check")
-                
-                if self.check_permission(user_id, action_name):
-                    return func(*args, **kwargs)
-                else:
-                    raise PermissionDenied(
-                        self._actions[action_name].level,
-                        self.get_user_level(user_id)
-                    )
-            
-            return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
+                guard(args, kwargs)
+                return func(*args, **kwargs)
+            return sync_wrapper
         return decorator
-
-
-import asyncio
@@ -5,10 +5,24 @@ Restricts file access to safe directories and prevents data leakage
 
 import os
 import re
+import time
+import threading
 from pathlib import Path
-from typing import Optional, Set, List
+from typing import Dict, Optional, Set, List, Tuple
 import logging
 
+# C-backed Aho-Corasick automaton for the literal path patterns (optional)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Recently validated paths are reused for a short while (resolve() and the
+# pattern checks are skipped); kept short so filesystem changes are seen
+VALIDATION_CACHE_SIZE = 1024
+VALIDATION_CACHE_TTL_S = 2.0
+
 
 class SandboxError(Exception):
     """Raised when sandbox policy is violated"""
@@ -27,7 +41,8 @@ class Sandbox:
     - Symlink protection
     """
     
-    # Blocked banking and financial apps/directories
+    # Blocked banking and financial apps/directories (all plain lowercase
+    # literals, so they can also be matched as substrings)
     BLOCKED_PATTERNS = [
         # Banking apps
         r"phonepe", r"gpay", r"googlepay", r"paytm",
@@ -60,54 +75,95 @@ class Sandbox:
         # Ensure allowed directory exists
         self.allowed_base.mkdir(parents=True, exist_ok=True)
         
-        # Compile regex patterns for performance
-        self._blocked_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.BLOCKED_PATTERNS
-        ]
-        self._blocked_file_patterns = [
-            re.compile(p, re.IGNORECASE) for p in self.BLOCKED_FILE_PATTERNS
-        ]
+        # Compile each pattern list into one alternation, so a path is
+        # walked once per list instead of once per pattern
+        self._blocked_re = re.compile(
+            "|".join(f"(?:{p})" for p in self.BLOCKED_PATTERNS), re.IGNORECASE
+        )
+        self._blocked_file_re = re.compile(
+            "|".join(f"(?:{p})" for p in self.BLOCKED_FILE_PATTERNS), re.IGNORECASE
+        )
+        
+        # With pyahocorasick, the literal directory patterns are matched in
+        # one automaton pass over the lowered path instead
+        self._blocked_ac = None
+        if ahocorasick is not None:
+            self._blocked_ac = ahocorasick.Automaton()
+            for p in self.BLOCKED_PATTERNS:
+                self._blocked_ac.add_word(p, p)
+            self._blocked_ac.make_automaton()
+        
+        # String form of the base for prefix-based containment checks
+        self._allowed_base_str = str(self.allowed_base)
+        self._allowed_prefix = os.path.join(self._allowed_base_str, "")
+        
+        # Home directory for "~/" paths, looked up once
+        self._home_str = str(Path.home())
+        
+        # (path, for_write) -> (resolved, monotonic time validated)
+        self._validated: Dict[Tuple[str, bool], Tuple[Path, float]] = {}
         
         self.logger = logging.getLogger(__name__)
     
-    def _resolve_path(self, path: str) -> Path:
+    def _resolve_path(self, path: str) -> str:
         """
         Resolve path with symlink protection
         
+        Returns:
+            The real (fully resolved) absolute path as a string
+        
         Raises:
             SandboxError: If path contains symlinks or is invalid
         """
-        path_obj = Path(path).expanduser()
+        path = str(path)
+        if path[:2] == "~/" or path == "~":
+            path_obj = Path(self._home_str + path[1:])
+        elif path[:1] == "~":
+            # ~user form
+            path_obj = Path(path).expanduser()
+        else:
+            path_obj = Path(path)
         
-        # Check for symlinks in any component of the path
-        for part in path_obj.parts:
-            part_path = Path(part)
-            if part_path.is_symlink():
-                raise SandboxError(
-                    f"Symlink detected in path: {path}"
-                )
-        
-        # Resolve to absolute path
+        # Check for symlinks in the path: one realpath() call settles the
+        # common no-symlink case; otherwise walk the components, following
+        # links outside the sandbox (system symlinks such as /tmp, or an
+        # alias of the sandbox root) and rejecting any link inside it
         try:
-            resolved = path_obj.resolve()
-        except (OSError, RuntimeError) as e:
+            abs_path = os.path.abspath(path_obj)
+            resolved = os.path.realpath(abs_path)
+        except (OSError, ValueError) as e:
             raise SandboxError(f"Invalid path: {path} - {e}")
         
+        if resolved != abs_path:
+            drive, rest = os.path.splitdrive(abs_path)
+            real = drive + os.sep
+            for name in rest.split(os.sep):
+                if not name:
+                    continue
+                part = os.path.join(real, name)
+                if os.path.islink(part):
+                    if part.startswith(self._allowed_prefix):
+                        raise SandboxError(
+                            f"Symlink detected in path: {path}"
+                        )
+                    real = os.path.realpath(part)
+                else:
+                    real = part
+        
         return resolved
     
-    def _check_path_traversal(self, resolved_path: Path) -> bool:
+    def _check_path_traversal(self, resolved_path: str) -> bool:
         """
         Check for path traversal attacks
         
         Returns:
             True if path is safe, False otherwise
         """
-        try:
-            # Path should be within allowed base after resolution
-            resolved_path.relative_to(self.allowed_base)
-            return True
-        except ValueError:
-            return False
+        # Path should be within allowed base after resolution
+        return (
+            resolved_path == self._allowed_base_str
+            or resolved_path.startswith(self._allowed_prefix)
+        )
     
     def _check_blocked_patterns(self, path: Path) -> bool:
         """
@@ -116,27 +172,28 @@ class Sandbox:
         Returns:
             True if path is safe, False if blocked
         """
-        path_str = str(path).lower()
-        
         # Check directory patterns
-        for pattern in self._blocked_patterns:
-            if pattern.search(path_str):
-                self.logger.warning(
-                    f"Blocked path matching banking pattern: {path}"
-                )
-                return False
+        if self._has_blocked_pattern(str(path).lower()):
+            self.logger.warning(
+                f"Blocked path matching banking pattern: {path}"
+            )
+            return False
         
         # Check file patterns
-        if path.is_file():
-            for pattern in self._blocked_file_patterns:
-                if pattern.search(path.name):
-                    self.logger.warning(
-                        f"Blocked file matching sensitive pattern: {path}"
-                    )
-                    return False
+        if path.is_file() and self._blocked_file_re.search(path.name):
+            self.logger.warning(
+                f"Blocked file matching sensitive pattern: {path}"
+            )
+            return False
         
         return True
     
+    def _has_blocked_pattern(self, text_lower: str) -> bool:
+        """Check lowered text for any BLOCKED_PATTERNS entry"""
+        if self._blocked_ac is not None:
+            return next(self._blocked_ac.iter(text_lower), None) is not None
+        return self._blocked_re.search(text_lower) is not None
+    
     def validate_path(self, path: str, for_write: bool = False) -> Path:
         """
         Validate a path for sandbox access
@@ -151,19 +208,37 @@ class Sandbox:
         Raises:
             SandboxError: If path violates sandbox policy
         """
+        key_path = str(path)
+        if key_path[:1] != "~" and not os.path.isabs(key_path):
+            # Relative paths resolve against the cwd, which may change
+            key_path = os.path.abspath(key_path)
+        key = (key_path, for_write)
+        now = time.monotonic()
+        cached = self._validated.get(key)
+        if cached and now - cached[1] < VALIDATION_CACHE_TTL_S:
+            return cached[0]
+        
+        resolved = self._validate_path_uncached(path)
+        
+        if len(self._validated) >= VALIDATION_CACHE_SIZE:
+            self._validated.pop(next(iter(self._validated)), None)
+        self._validated[key] = (resolved, now)
+        return resolved
+    
+    def _validate_path_uncached(self, path: str) -> Path:
+        """Run the full validation for validate_path (no cache)"""
         # Resolve path
-        try:
-            resolved = self._resolve_path(path)
-        except SandboxError:
-            raise
+        resolved_str = self._resolve_path(path)
         
         # Check path traversal
-        if not self._check_path_traversal(resolved):
+        if not self._check_path_traversal(resolved_str):
             raise SandboxError(
                 f"Path traversal detected: {path} resolves outside "
                 f"allowed directory {self.allowed_base}"
             )
         
+        resolved = Path(resolved_str)
+        
         # Check blocked patterns
         if not self._check_blocked_patterns(resolved):
             raise SandboxError(
@@ -210,11 +285,23 @@ class Sandbox:
         """Safely list directory contents"""
         resolved = self.validate_path(path)
         
+        # The directory itself has passed the pattern checks and the
+        # patterns never contain "/", so only entry names need scanning;
+        # scandir's is_file() uses the dirent type instead of a stat
         items = []
-        for item in resolved.iterdir():
-            # Filter out blocked patterns
-            if self._check_blocked_patterns(item):
-                items.append(item.name)
+        with os.scandir(resolved) as entries:
+            for entry in entries:
+                name = entry.name
+                if self._has_blocked_pattern(name.lower()):
+                    self.logger.warning(
+                        f"Blocked path matching banking pattern: {entry.path}"
+                    )
+                elif entry.is_file() and self._blocked_file_re.search(name):
+                    self.logger.warning(
+                        f"Blocked file matching sensitive pattern: {entry.path}"
+                    )
+                else:
+                    items.append(name)
         
         return items
     
@@ -242,20 +329,26 @@ class Sandbox:
 
 # Global sandbox instance
 _sandbox: Optional[Sandbox] = None
+_sandbox_lock = threading.Lock()
 
 
 def get_sandbox() -> Sandbox:
     """Get or create global sandbox"""
     global _sandbox
     if _sandbox is None:
-        _sandbox = Sandbox()
+        # Double-checked so concurrent first callers build only one
+        with _sandbox_lock:
+            if _sandbox is None:
+                _sandbox = Sandbox()
     return _sandbox
 
 
 def configure_sandbox(allowed_base: str):
     """Configure global sandbox with custom base directory"""
     global _sandbox
-    _sandbox = Sandbox(allowed_base)
+    sandbox = Sandbox(allowed_base)
+    with _sandbox_lock:
+        _sandbox = sandbox
 
 
 if __name__ == "__main__":
@@ -5,13 +5,20 @@ Manages the flow: greeting -> listen -> respond -> speak.
 
 import asyncio
 import json
+import random
 import time
 import re
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime
 import logging
 
+# C-backed Aho-Corasick automaton for the blocked topic scan (optional)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -49,6 +56,63 @@ class ConversationContext:
         ])
 
 
+class TermuxAudioWorker:
+    """
+    Long-lived termux-tts-speak process fed one utterance per stdin line.
+    
+    Saves a process and Termux:API start per turn. The tool does not
+    report when a line has been spoken, so the end of speech is
+    estimated from the text length.
+    """
+    
+    # Rough Android TTS speaking rate at default pitch and speed
+    CHARS_PER_SECOND = 14.0
+    
+    def __init__(self):
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._busy_until = 0.0
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the TTS process is up and accepting text."""
+        return self._proc is not None and self._proc.returncode is None
+    
+    async def start(self):
+        """Start the TTS process if it is not already running."""
+        if self.is_running:
+            return
+        self._proc = await asyncio.create_subprocess_exec(
+            'termux-tts-speak',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self._busy_until = 0.0
+    
+    async def speak(self, text: str):
+        """Queue text for speaking; returns once it is handed to the process."""
+        line = " ".join(text.split())
+        if not line:
+            return
+        self._proc.stdin.write(line.encode() + b"\n")
+        await self._proc.stdin.drain()
+        
+        now = time.monotonic()
+        self._busy_until = max(now, self._busy_until) + len(line) / self.CHARS_PER_SECOND
+    
+    async def wait_idle(self):
+        """Wait until queued speech is expected to have finished."""
+        delay = self._busy_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def stop(self):
+        """Close stdin; the process exits after speaking queued lines."""
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.stdin.close()
+
+
 class CallConversation:
     """
     Manages voice conversation during an active call.
@@ -97,6 +161,25 @@ class CallConversation:
         'personal information', 'private',
     ]
     
+    # Spoken while the LLM is still working on a reply
+    FILLER_PHRASE = "One moment..."
+    FILLER_DELAY_S = 0.25
+    
+    # Streamed replies are spoken at the first clause, then per sentence
+    CLAUSE_END_RE = re.compile(r'(?<=[.!?,;:])\s+')
+    SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+    
+    SYSTEM_PROMPT = """You are a helpful phone assistant. You are speaking on behalf of someone who is unavailable.
+                Rules:
+                - Be concise (max 2 sentences)
+                - Be polite and professional
+                - Do NOT share any personal, location, or schedule information
+                - Do NOT share passwords, financial info, or private details
+                - If unsure, ask caller to leave a message or call back later
+                - Respond in the same language as the caller"""
+    
+    UNSURE_RESPONSE = "I'm not sure about that. Could you please leave a message?"
+    
     def __init__(
         self,
         call_handler: CallHandler,
@@ -129,6 +212,24 @@ class CallConversation:
         self._hangup_callbacks: List[Callable[[ConversationContext], None]] = []
         self._error_count = 0
         self._max_errors = 3
+        self._audio_worker = TermuxAudioWorker()
+        
+        # With pyahocorasick, blocked topics are matched in one automaton pass
+        # over the lowered text; otherwise they join the regex alternation
+        self._topic_ac = None
+        topics = [re.escape(t) for t in self.BLOCKED_TOPICS]
+        if ahocorasick is not None:
+            self._topic_ac = ahocorasick.Automaton()
+            for topic in self.BLOCKED_TOPICS:
+                self._topic_ac.add_word(topic, topic)
+            self._topic_ac.make_automaton()
+            topics = []
+        
+        # Single pass over confidential patterns (and topics without the automaton)
+        self._confidential_re = re.compile(
+            "|".join(f"(?:{p})" for p in self.CONFIDENTIAL_PATTERNS + topics),
+            re.IGNORECASE
+        )
     
     def _check_confidential_request(self, text: str) -> tuple[bool, str]:
         """
@@ -137,17 +238,15 @@ class CallConversation:
         Returns:
             (is_confidential, safe_response)
         """
-        text_lower = text.lower()
+        match = self._confidential_re.search(text)
+        if match:
+            logger.warning(f"Confidential info request detected: {match.group(0)}")
+            return True, self._get_blocked_response()
         
-        for pattern in self.CONFIDENTIAL_PATTERNS:
-            if re.search(pattern, text_lower):
-                logger.warning(f"Confidential info request detected: {pattern}")
-                return True, self._get_blocked_response()
-        
-        # Check for blocked topics
-        for topic in self.BLOCKED_TOPICS:
-            if topic in text_lower:
-                logger.warning(f"Blocked topic detected: {topic}")
+        if self._topic_ac is not None:
+            hit = next(self._topic_ac.iter(text.lower()), None)
+            if hit is not None:
+                logger.warning(f"Blocked topic detected: {hit[1]}")
                 return True, self._get_blocked_response()
         
         return False, ""
@@ -159,7 +258,6 @@ class CallConversation:
             "I'm sorry, I cannot discuss personal or confidential matters over the phone.",
             "For privacy reasons, I'm unable to provide that information. Please contact directly if needed.",
         ]
-        import random
         return random.choice(responses)
     
     async def _speak(self, text: str) -> bool:
@@ -176,14 +274,23 @@ class CallConversation:
                 elapsed = (time.time() - start_time) * 1000
                 logger.info(f"TTS completed in {elapsed:.0f}ms")
                 return True
+            elif self._audio_worker.is_running:
+                # Fallback: feed the call's long-lived termux-tts-speak
+                await self._audio_worker.speak(text)
+                return True
             else:
-                # Fallback: use termux-tts-speak
-                import subprocess
-                subprocess.run(
-                    ['termux-tts-speak', text],
-                    capture_output=True,
-                    timeout=30
+                # Fallback: use termux-tts-speak without blocking the loop
+                proc = await asyncio.create_subprocess_exec(
+                    'termux-tts-speak', text,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL
                 )
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=30)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    raise
                 return True
         except Exception as e:
             logger.error(f"TTS error: {e}")
@@ -210,17 +317,24 @@ class CallConversation:
                     logger.info(f"STT completed in {elapsed:.0f}ms: {text}")
                     return text
             else:
-                # Fallback: use termux-speech-to-text
-                import subprocess
-                result = subprocess.run(
-                    ['termux-speech-to-text', '-t', str(timeout)],
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout + 5
+                # Fallback: use termux-speech-to-text without blocking the loop
+                proc = await asyncio.create_subprocess_exec(
+                    'termux-speech-to-text', '-t', str(timeout),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
                 )
+                try:
+                    stdout, _ = await asyncio.wait_for(
+                        proc.communicate(), timeout=timeout + 5
+                    )
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    raise
                 
-                if result.returncode == 0 and result.stdout.strip():
-                    return result.stdout.strip()
+                text = stdout.decode(errors='replace').strip()
+                if proc.returncode == 0 and text:
+                    return text
                     
         except Exception as e:
             logger.error(f"STT error: {e}")
@@ -250,17 +364,8 @@ class CallConversation:
         # Use LLM if available
         if self.llm_client:
             try:
-                system_prompt = """You are a helpful phone assistant. You are speaking on behalf of someone who is unavailable.
-                Rules:
-                - Be concise (max 2 sentences)
-                - Be polite and professional
-                - Do NOT share any personal, location, or schedule information
-                - Do NOT share passwords, financial info, or private details
-                - If unsure, ask caller to leave a message or call back later
-                - Respond in the same language as the caller"""
-                
                 response = await self.llm_client.generate(
-                    system=system_prompt,
+                    system=self.SYSTEM_PROMPT,
                     prompt=caller_input,
                     max_tokens=100,
                     temperature=0.7
@@ -271,7 +376,7 @@ class CallConversation:
                 
                 # Verify response doesn't contain blocked info
                 if self._check_confidential_request(response)[0]:
-                    return "I'm not sure about that. Could you please leave a message?"
+                    return self.UNSURE_RESPONSE
                 
                 return response
                 
@@ -279,15 +384,133 @@ class CallConversation:
                 logger.error(f"LLM error: {e}")
                 self._error_count += 1
         
-        # Fallback responses
+        return self._get_fallback_response()
+    
+    def _get_fallback_response(self) -> str:
+        """Get response for when the LLM is unavailable."""
         fallback_responses = [
             "I'm currently unavailable. Please leave a message.",
             "I can't take your call right now. Please call back later.",
             "I'm assisting someone else. Can I take a message?",
         ]
-        import random
         return random.choice(fallback_responses)
     
+    async def _split_sentences(self, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Regroup streamed LLM tokens into speakable chunks.
+        
+        The first chunk ends at the first clause boundary so speech can
+        start early; later chunks end at sentence boundaries.
+        """
+        buffer = ""
+        boundary = self.CLAUSE_END_RE
+        async for token in tokens:
+            buffer += token
+            match = boundary.search(buffer)
+            while match:
+                chunk = buffer[:match.start()].strip()
+                buffer = buffer[match.end():]
+                if chunk:
+                    yield chunk
+                    boundary = self.SENTENCE_END_RE
+                match = boundary.search(buffer)
+        
+        buffer = buffer.strip()
+        if buffer:
+            yield buffer
+    
+    async def _generate_response_stream(self, caller_input: str) -> AsyncIterator[str]:
+        """
+        Generate a response as a stream of speakable chunks.
+        
+        Falls back to a single chunk from _generate_response when the
+        LLM client has no stream() method.
+        
+        Args:
+            caller_input: Text from caller
+            
+        Yields:
+            Response chunks, each checked for confidential content
+        """
+        stream = getattr(self.llm_client, 'stream', None)
+        if stream is None:
+            yield await self._generate_response(caller_input)
+            return
+        
+        # Check for confidential request first
+        is_confidential, blocked_response = self._check_confidential_request(caller_input)
+        if is_confidential:
+            if self.context:
+                self.context.blocked_attempts.append(caller_input)
+            yield blocked_response
+            return
+        
+        start_time = time.time()
+        yielded = False
+        try:
+            tokens = stream(
+                system=self.SYSTEM_PROMPT,
+                prompt=caller_input,
+                max_tokens=100,
+                temperature=0.7
+            )
+            async for chunk in self._split_sentences(tokens):
+                # Verify each chunk before it is spoken
+                if self._check_confidential_request(chunk)[0]:
+                    yield self.UNSURE_RESPONSE
+                    return
+                
+                if not yielded:
+                    elapsed = time.time() - start_time
+                    logger.info(f"LLM first chunk generated in {elapsed:.2f}s")
+                yielded = True
+                yield chunk
+            
+            if yielded:
+                return
+                
+        except Exception as e:
+            logger.error(f"LLM error: {e}")
+            self._error_count += 1
+            if yielded:
+                return
+        
+        yield self._get_fallback_response()
+    
+    async def _speak_response(self, caller_input: str) -> bool:
+        """
+        Generate and speak a response chunk by chunk.
+        
+        Speaks a filler phrase if the first chunk is slow to arrive.
+        
+        Returns:
+            True if the whole response was spoken, False on TTS failure
+        """
+        chunks = self._generate_response_stream(caller_input)
+        first = asyncio.ensure_future(chunks.__anext__())
+        spoken: List[str] = []
+        try:
+            done, _ = await asyncio.wait([first], timeout=self.FILLER_DELAY_S)
+            if not done:
+                await self._speak(self.FILLER_PHRASE)
+            
+            try:
+                chunk = await first
+                while True:
+                    if not await self._speak(chunk):
+                        return False
+                    spoken.append(chunk)
+                    chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return True
+        finally:
+            if first.done():
+                await chunks.aclose()
+            else:
+                first.cancel()
+            if spoken and self.context:
+                self.context.add_turn("assistant", " ".join(spoken))
+    
     def _check_hangup(self) -> bool:
         """Check if call has ended."""
         call_info = self.call_handler.get_call_state()
@@ -299,6 +522,7 @@ class CallConversation:
     
     def _notify_hangup(self):
         """Notify all hangup callbacks."""
+        self._audio_worker.stop()
         if self.context:
             for callback in self._hangup_callbacks:
                 try:
@@ -324,6 +548,12 @@ class CallConversation:
         
         logger.info(f"Starting conversation with {call_info.phone_number}")
         
+        if not self.tts_engine:
+            try:
+                await self._audio_worker.start()
+            except OSError as e:
+                logger.warning(f"TTS worker unavailable, speaking per turn: {e}")
+        
         # Generate and speak greeting
         greeting = self.greeting_generator.generate(
             caller_number=call_info.phone_number,
@@ -332,6 +562,7 @@ class CallConversation:
         
         if not await self._speak(greeting):
             logger.error("Failed to speak greeting - rejecting call")
+            self._audio_worker.stop()
             self.call_handler.reject_call()
             return
         
@@ -346,7 +577,8 @@ class CallConversation:
                 logger.info("Call ended detected")
                 break
             
-            # Listen for caller input
+            # Listen for caller input once our own speech has finished
+            await self._audio_worker.wait_idle()
             caller_input = await self._listen(timeout=10)
             
             if not caller_input:
@@ -362,12 +594,8 @@ class CallConversation:
             silence_count = 0
             self.context.add_turn("caller", caller_input)
             
-            # Generate and speak response
-            response = await self._generate_response(caller_input)
-            
-            if await self._speak(response):
-                self.context.add_turn("assistant", response)
-            else:
+            # Stream the response, covering LLM latency with a filler phrase
+            if not await self._speak_response(caller_input):
                 logger.error("TTS failed - ending conversation")
                 break
             
@@ -382,6 +610,7 @@ class CallConversation:
     def stop(self):
         """Stop the conversation."""
         self.is_active = False
+        self._audio_worker.stop()
         logger.info("Conversation stopped")
 
 
@@ -3,8 +3,9 @@ Greeting generator for phone calls.
 Provides personalized and context-aware greetings.
 """
 
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
+from functools import lru_cache
 import random
 import logging
 
@@ -180,6 +181,30 @@ class GreetingGenerator:
         }
         logger.info(f"Added contact: {name} ({phone_number})")
     
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _greeting_options(
+        time_of_day: str,
+        lang: str,
+        owner_name: str,
+        known_contact: bool
+    ) -> Tuple[str, ...]:
+        """Formatted greeting choices; only a handful of keys ever occur"""
+        if known_contact:
+            greetings = GreetingGenerator.GREETINGS.get(lang, GreetingGenerator.GREETINGS['en'])
+            
+            if time_of_day in greetings:
+                templates = greetings[time_of_day]
+            else:
+                templates = greetings['unknown']
+            
+            return tuple(t.format(name=owner_name) for t in templates)
+        
+        prof_greetings = GreetingGenerator.PROFESSIONAL_GREETINGS.get(
+            lang, GreetingGenerator.PROFESSIONAL_GREETINGS['en']
+        )
+        return tuple(t.format(owner_name=owner_name) for t in prof_greetings)
+    
     def generate(
         self,
         caller_number: Optional[str] = None,
@@ -212,24 +237,11 @@ class GreetingGenerator:
         else:
             lang = self.default_language
         
-        # Get greeting template
-        if contact_info:
-            # Personalized greeting for known contact
-            name = contact_info['name']
-            greetings = self.GREETINGS.get(lang, self.GREETINGS['en'])
-            
-            if time_of_day in greetings:
-                templates = greetings[time_of_day]
-            else:
-                templates = greetings['unknown']
-            
-            greeting = random.choice(templates).format(name=self.owner_name)
-        else:
-            # Professional greeting for unknown caller
-            prof_greetings = self.PROFESSIONAL_GREETINGS.get(
-                lang, self.PROFESSIONAL_GREETINGS['en']
-            )
-            greeting = random.choice(prof_greetings).format(owner_name=self.owner_name)
+        # Known contacts get a personalized greeting, others a professional one
+        options = self._greeting_options(
+            time_of_day, lang, self.owner_name, bool(contact_info)
+        )
+        greeting = random.choice(options)
         
         return greeting
     
@@ -143,7 +143,7 @@ connectToWhatsApp().catch(console.error);
             self.process = subprocess.Popen(
                 ['node', str(self.wrapper_script)],
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,  # Unread; a full pipe would block node
                 text=True,
                 env=env,
                 cwd=str(self.session_dir.parent)
@@ -0,0 +1,63 @@
+"""
+Tests for AuditLogger event coalescing
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from security import audit
+from security.audit import AuditLogger
+
+
+def _summaries(log_dir: Path) -> dict:
+    """record_id -> repeats for every summary entry written so far"""
+    lines = (log_dir / "audit_current.log").read_text().splitlines()
+    entries = [json.loads(line) for line in lines]
+    return {
+        e["details"]["record_id"]: e["details"]["repeats"]
+        for e in entries
+        if "repeats" in e["details"]
+    }
+
+
+def test_closed_windows_are_summarised_under_steady_traffic(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "COALESCE_WINDOW_S", 0.2)
+    logger = AuditLogger(log_dir=str(tmp_path))
+    try:
+        # Distinct keys, each repeated once, with no idle gap for the writer
+        deadline = time.monotonic() + 1.0
+        n = 0
+        while time.monotonic() < deadline:
+            for _ in range(2):
+                logger.log_data_access("contacts", "read", record_id=str(n))
+            n += 1
+            time.sleep(0.005)
+
+        # Well under one window, so the writer has not been idle since
+        time.sleep(0.05)
+        written = _summaries(tmp_path)
+
+        assert written.get("0") == 1
+        assert len(written) >= n // 4
+    finally:
+        logger.close()
+
+
+def test_open_windows_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "COALESCE_MAX_KEYS", 8)
+    logger = AuditLogger(log_dir=str(tmp_path))
+    try:
+        for n in range(20):
+            for _ in range(2):
+                logger.log_data_access("contacts", "read", record_id=str(n))
+
+        assert len(logger._buckets) == 8
+
+        logger.flush()
+        assert _summaries(tmp_path) == {str(n): 1 for n in range(20)}
+    finally:
+        logger.close()
@@ -0,0 +1,46 @@
+"""
+Regression tests for Sandbox symlink handling
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from security.sandbox import Sandbox, SandboxError
+
+
+@pytest.fixture
+def sandbox_root(tmp_path):
+    """Sandbox root with a symlinked directory inside and an alias outside"""
+    root = tmp_path / "root"
+    (root / "cc" / "real").mkdir(parents=True)
+    os.symlink(root / "cc" / "real", root / "cc" / "lnk")
+    os.symlink(root, tmp_path / "root_alias")
+    return root
+
+
+def test_symlink_inside_sandbox_is_blocked(sandbox_root):
+    sandbox = Sandbox(str(sandbox_root))
+
+    with pytest.raises(SandboxError):
+        sandbox.validate_path(str(sandbox_root / "cc" / "lnk" / "x"))
+
+
+def test_symlink_inside_sandbox_is_blocked_via_aliased_root(sandbox_root):
+    sandbox = Sandbox(str(sandbox_root))
+    alias = sandbox_root.parent / "root_alias"
+
+    with pytest.raises(SandboxError):
+        sandbox.validate_path(str(alias / "cc" / "lnk" / "x"))
+
+
+def test_aliased_root_without_inner_symlink_is_allowed(sandbox_root):
+    sandbox = Sandbox(str(sandbox_root))
+    alias = sandbox_root.parent / "root_alias"
+
+    resolved = sandbox.validate_path(str(alias / "cc" / "real" / "x"))
+    assert resolved == sandbox_root.resolve() / "cc" / "real" / "x"
@@ -0,0 +1,87 @@
+"""
+Tests for parsing telegram-cli main_session updates
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from interface.telegram_cli import TelegramCLI
+
+
+# main_session lines as pushed by `telegram-cli --json`
+PRIVATE_MESSAGE = (
+    '{"event": "message", "id": 2481, "flags": 257, '
+    '"from": {"peer_type": "user", "peer_id": 123456789, "print_name": "Ravi_Kumar", '
+    '"first_name": "Ravi", "last_name": "Kumar", "username": "ravik", "phone": "919800000000"}, '
+    '"to": {"peer_type": "user", "peer_id": 987654321, "print_name": "Closed_Claw", '
+    '"first_name": "Closed", "last_name": "Claw"}, '
+    '"out": false, "unread": true, "service": false, "date": 1760600000, "text": "/status"}'
+)
+
+GROUP_MESSAGE = (
+    '{"event": "message", "id": "0500000012fd1c55b50100000000000000000000", "flags": 257, '
+    '"from": {"peer_type": "user", "peer_id": 123456789, "print_name": "Ravi_Kumar"}, '
+    '"to": {"peer_type": "chat", "peer_id": 4242, "print_name": "Family"}, '
+    '"out": false, "unread": true, "service": false, "date": 1760600060, "text": "hello all"}'
+)
+
+OUTGOING_MESSAGE = (
+    '{"event": "message", "id": 2482, "flags": 259, '
+    '"from": {"peer_type": "user", "peer_id": 987654321, "print_name": "Closed_Claw"}, '
+    '"to": {"peer_type": "user", "peer_id": 123456789, "print_name": "Ravi_Kumar"}, '
+    '"out": true, "unread": false, "service": false, "date": 1760600005, "text": "Status: OK"}'
+)
+
+STATUS_UPDATE = (
+    '{"event": "online-status", "user": {"peer_type": "user", "peer_id": 123456789}, '
+    '"online": true, "when": "2025-10-16 12:00:00"}'
+)
+
+
+def test_private_message_update_is_parsed():
+    client = TelegramCLI()
+
+    messages = client._parse_messages(PRIVATE_MESSAGE)
+
+    assert len(messages) == 1
+    msg = messages[0]
+    assert msg.message_id == 2481
+    assert msg.user_id == 123456789
+    assert msg.chat_id == 123456789
+    assert msg.username == "ravik"
+    assert msg.text == "/status"
+    assert msg.timestamp == datetime.fromtimestamp(1760600000)
+
+
+def test_group_message_uses_chat_id_and_local_message_id():
+    client = TelegramCLI()
+
+    messages = client._parse_messages(GROUP_MESSAGE)
+
+    assert len(messages) == 1
+    assert messages[0].chat_id == 4242
+    assert messages[0].user_id == 123456789
+    assert messages[0].username is None
+    assert messages[0].message_id == 1
+
+
+def test_outgoing_and_non_message_events_are_ignored():
+    client = TelegramCLI()
+
+    raw = "\n".join([OUTGOING_MESSAGE, STATUS_UPDATE, PRIVATE_MESSAGE])
+    messages = client._parse_messages(raw)
+
+    assert [m.text for m in messages] == ["/status"]
+
+
+def test_dialog_list_lines_still_parse():
+    client = TelegramCLI()
+
+    messages = client._parse_messages("[4242] [123456789] @ravik [09:15] good morning")
+
+    assert len(messages) == 1
+    assert messages[0].user_id == 123456789
+    assert messages[0].text == "good morning"